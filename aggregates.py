@@ -0,0 +1,282 @@
+import numpy as np
+import pandas as pd
+
+"""
+Precomputed Aggregates for the Dashboard
+
+Builds every rollup the dashboard tabs show, for all countries at once,
+with one grouped pass per rollup. The result is a dict keyed by country,
+so switching countries or tabs is a dictionary lookup instead of a scan.
+"""
+
+# Normalize column names from generator to names used by the dashboard
+RENAME_MAP = {
+    "Market_Share": "MarketShare",
+    "Users_Millions": "UsersMillions",
+    "Usage_Hours": "UsageHours",
+}
+
+# Rollups over all dates (per trend, the column it is split by) and rollups
+# of the latest date only, as maintained by update_cubes
+TREND_KEYS = {"brand_trend": "Brand", "os_trend": "OS"}
+LATEST_KEYS = ["brand_share", "os_share", "brand_usage", "brand_users"]
+
+# Columns each tab reads. For columnar datasets only these columns are
+# decoded: the rollups read the union of the chart tabs' columns (once per
+# dataset), and the Raw Data tab reads its own columns when it is opened.
+TAB_COLUMNS = {
+    "metrics": ["Date", "Market_Share", "Usage_Hours"],
+    "trends": ["Date", "Brand", "OS", "Market_Share"],
+    "brand": ["Date", "Brand", "Market_Share"],
+    "os": ["Date", "OS", "Market_Share"],
+    "usage": ["Date", "Brand", "Usage_Hours", "Users_Millions"],
+    "raw": ["Country", "Date", "Brand", "OS", "Market_Share", "Users_Millions", "Usage_Hours"],
+}
+
+
+def _split_by_country(frame, sort_by=None, ascending=True, head=None):
+    """Split a frame indexed by (Country, ...) into per-country frames.
+
+    Sorting and top-n selection are applied to the whole frame first, so
+    each country only costs one positional slice.
+    """
+    flat = frame.reset_index()
+    if sort_by is not None:
+        flat = flat.sort_values(["Country", sort_by], ascending=[True, ascending], kind="stable")
+        if head is not None:
+            flat = flat.groupby("Country", observed=True, sort=False).head(head)
+    country = flat["Country"].to_numpy()
+    values = flat.drop(columns="Country").reset_index(drop=True)
+
+    starts = np.flatnonzero(np.r_[True, country[1:] != country[:-1]])
+    stops = np.r_[starts[1:], len(country)]
+    return {country[a]: values.iloc[a:b].reset_index(drop=True) for a, b in zip(starts, stops)}
+
+
+def build_cubes(df):
+    """Build the dashboard rollups for every country in ``df``.
+
+    Returns ``{country: cubes}`` where ``cubes`` holds:
+
+    - ``metrics``: start/end date and average share/usage (with the
+      number of values averaged, so ``update_cubes`` can combine them)
+    - ``brand_trend``, ``os_trend``: MarketShare summed per Date x Brand/OS
+    - ``brand_share``, ``os_share``: MarketShare on the latest date
+    - ``brand_usage``: mean UsageHours per Brand on the latest date
+    - ``brand_users``: top 10 brands by UsersMillions on the latest date
+
+    Rollups whose columns are missing from ``df`` are None.
+    """
+    df = df.rename(columns=RENAME_MAP)
+    if "Date" in df.columns and not pd.api.types.is_datetime64_any_dtype(df["Date"]):
+        df = df.assign(Date=pd.to_datetime(df["Date"], errors="coerce"))
+
+    def has(*columns):
+        return all(c in df.columns for c in columns)
+
+    countries = df["Country"].unique()
+    cubes = {country: dict.fromkeys(
+        ["metrics", "brand_trend", "os_trend", "brand_share", "os_share", "brand_usage", "brand_users"]
+    ) for country in countries}
+
+    # Top metrics
+    by_country = df.groupby("Country", observed=True, sort=False)
+    metrics = pd.DataFrame(index=pd.Index(countries, name="Country"))
+    if has("Date"):
+        metrics["start"] = by_country["Date"].min()
+        metrics["end"] = by_country["Date"].max()
+    if has("MarketShare"):
+        metrics["avg_share"] = by_country["MarketShare"].mean()
+        metrics["share_count"] = by_country["MarketShare"].count()
+    if has("UsageHours"):
+        metrics["avg_usage"] = by_country["UsageHours"].mean()
+        metrics["usage_count"] = by_country["UsageHours"].count()
+    for country, row in metrics.iterrows():
+        cubes[country]["metrics"] = row.to_dict()
+
+    # Trends over time
+    if has("Date", "Brand", "MarketShare"):
+        brand_trend = df.groupby(["Country", "Date", "Brand"], observed=True)["MarketShare"].sum()
+        for country, frame in _split_by_country(brand_trend).items():
+            cubes[country]["brand_trend"] = frame
+    if has("Date", "OS", "MarketShare"):
+        os_trend = df.groupby(["Country", "Date", "OS"], observed=True)["MarketShare"].sum()
+        for country, frame in _split_by_country(os_trend).items():
+            cubes[country]["os_trend"] = frame
+
+    # Latest-date distributions
+    if has("Date"):
+        latest = df[df["Date"] == by_country["Date"].transform("max")]
+    else:
+        latest = df
+
+    if has("Brand"):
+        brand_aggs = {}
+        if has("MarketShare"):
+            brand_aggs["MarketShare"] = ("MarketShare", "sum")
+        if has("UsageHours"):
+            brand_aggs["UsageHours"] = ("UsageHours", "mean")
+        if has("UsersMillions"):
+            brand_aggs["UsersMillions"] = ("UsersMillions", "sum")
+        if brand_aggs:
+            brand_latest = latest.groupby(["Country", "Brand"], observed=True).agg(**brand_aggs)
+            rollups = [
+                ("brand_share", "MarketShare", False, None),
+                ("brand_usage", "UsageHours", True, None),
+                ("brand_users", "UsersMillions", False, 10),
+            ]
+            for name, column, ascending, head in rollups:
+                if column in brand_latest:
+                    split = _split_by_country(brand_latest[column], column, ascending, head)
+                    for country, frame in split.items():
+                        cubes[country][name] = frame
+
+    if has("OS", "MarketShare"):
+        os_latest = latest.groupby(["Country", "OS"], observed=True)["MarketShare"].sum()
+        for country, frame in _split_by_country(os_latest, "MarketShare", ascending=False).items():
+            cubes[country]["os_share"] = frame
+
+    return cubes
+
+
+
+def _merge_cube(old, new):
+    """Combine a country's cubes with the cubes of its newly appended rows.
+
+    Returns None when the result cannot be derived from the two alone (the
+    new rows fall on the current latest date, or a rollup is missing).
+    """
+    old_metrics, new_metrics = old["metrics"] or {}, new["metrics"] or {}
+    if "end" not in old_metrics or "end" not in new_metrics:
+        return None
+    old_end, new_end = old_metrics["end"], new_metrics["end"]
+    if pd.isna(old_end) or pd.isna(new_end) or new_end == old_end:
+        return None
+
+    metrics = dict(old_metrics)
+    metrics["start"] = min(old_metrics["start"], new_metrics["start"])
+    metrics["end"] = max(old_end, new_end)
+    for avg, count in [("avg_share", "share_count"), ("avg_usage", "usage_count")]:
+        if (avg in old_metrics) != (avg in new_metrics) or (avg in old_metrics and count not in old_metrics):
+            return None
+        if avg in old_metrics:
+            total = old_metrics[count] + new_metrics[count]
+            if total:
+                metrics[avg] = (old_metrics[avg] * old_metrics[count]
+                                + new_metrics[avg] * new_metrics[count]) / total
+            metrics[count] = total
+
+    merged = {"metrics": metrics}
+    for key, column in TREND_KEYS.items():
+        if (old[key] is None) != (new[key] is None):
+            return None
+        if old[key] is None:
+            merged[key] = None
+        elif new_metrics["start"] > old_end:
+            # Only later dates: the sums per date are untouched
+            merged[key] = pd.concat([old[key], new[key]], ignore_index=True)
+        else:
+            merged[key] = (pd.concat([old[key], new[key]], ignore_index=True)
+                           .groupby(["Date", column], observed=True, as_index=False)["MarketShare"].sum())
+
+    # Latest-date rollups come from whichever side holds the latest date
+    latest = new if new_end > old_end else old
+    for key in LATEST_KEYS:
+        merged[key] = latest[key]
+    return merged
+
+
+def update_cubes(cubes, rows, country_rows):
+    """Fold appended rows into cubes made by ``build_cubes``.
+
+    Only the countries in ``rows`` are recomputed, and only from ``rows``:
+    trend sums and averages are combined with the existing ones and the
+    latest-date rollups are replaced when ``rows`` bring a newer date. A
+    country whose new rows land on its current latest date is rebuilt from
+    ``country_rows(country)``, which must return all of its rows. Returns a
+    new dict; cubes of other countries are shared with ``cubes``.
+    """
+    updated = dict(cubes)
+    rebuild = []
+    for country, new in build_cubes(rows).items():
+        old = cubes.get(country)
+        merged = new if old is None else _merge_cube(old, new)
+        if merged is None:
+            rebuild.append(country)
+        else:
+            updated[country] = merged
+    if rebuild:
+        updated.update(build_cubes(pd.concat([country_rows(c) for c in rebuild], ignore_index=True)))
+    return updated
+
+
+def build_comparison(df):
+    """Build the rollups that compare countries side by side.
+
+    Rows are grouped once by Country x Date x Brand x OS; every comparison
+    chart is derived from that (much smaller) cube. Returns a dict of
+    frames over all countries in ``df``:
+
+    - ``cube``: MarketShare and UsersMillions summed, and UsageHours summed
+      and counted, per Country x Date x Brand x OS
+    - ``brand_share``, ``os_share``: MarketShare per Brand/OS on each
+      country's latest date
+    - ``brand_users``: UsersMillions per Brand on each country's latest date
+    - ``brand_usage``: mean UsageHours per Brand on each country's latest date
+
+    Frames whose columns are missing from ``df`` are None.
+    """
+    df = df.rename(columns=RENAME_MAP)
+    keys = [c for c in ["Country", "Date", "Brand", "OS"] if c in df.columns]
+    aggs = {}
+    if "MarketShare" in df.columns:
+        aggs["MarketShare"] = ("MarketShare", "sum")
+    if "UsersMillions" in df.columns:
+        aggs["UsersMillions"] = ("UsersMillions", "sum")
+    if "UsageHours" in df.columns:
+        aggs["UsageSum"] = ("UsageHours", "sum")
+        aggs["UsageCount"] = ("UsageHours", "count")
+
+    comparison = dict.fromkeys(["cube", "brand_share", "os_share", "brand_users", "brand_usage"])
+    if not aggs or "Country" not in keys:
+        return comparison
+    cube = df.groupby(keys, observed=True).agg(**aggs).reset_index()
+    comparison["cube"] = cube
+
+    if "Date" in cube.columns:
+        latest = cube[(cube["Date"] == cube.groupby("Country", observed=True)["Date"].transform("max")).to_numpy()]
+    else:
+        latest = cube
+
+    def latest_by(column, values):
+        if column not in latest.columns or any(v not in latest.columns for v in values):
+            return None
+        return latest.groupby(["Country", column], observed=True, as_index=False)[values].sum()
+
+    comparison["brand_share"] = latest_by("Brand", ["MarketShare"])
+    comparison["os_share"] = latest_by("OS", ["MarketShare"])
+    comparison["brand_users"] = latest_by("Brand", ["UsersMillions"])
+    usage = latest_by("Brand", ["UsageSum", "UsageCount"])
+    if usage is not None:
+        usage["UsageHours"] = usage["UsageSum"] / usage["UsageCount"].where(usage["UsageCount"] > 0)
+        comparison["brand_usage"] = usage.drop(columns=["UsageSum", "UsageCount"])
+    return comparison
+
+
+def select_comparison(comparison, countries):
+    """Restrict comparison rollups to ``countries``, in the given order."""
+    order = {country: i for i, country in enumerate(countries)}
+    selected = {}
+    for name, frame in comparison.items():
+        if frame is None:
+            selected[name] = None
+            continue
+        rank = frame["Country"].map(order)
+        keep = rank.notna().to_numpy()
+        frame = frame[keep].assign(_rank=rank[keep]).sort_values("_rank", kind="stable").drop(columns="_rank")
+        if isinstance(frame["Country"].dtype, pd.CategoricalDtype):
+            frame["Country"] = frame["Country"].cat.remove_unused_categories().cat.reorder_categories(
+                [c for c in countries if c in set(frame["Country"])]
+            )
+        selected[name] = frame.reset_index(drop=True)
+    return selected
@@ -0,0 +1,247 @@
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import charts
+from aggregates import TAB_COLUMNS, build_cubes
+from country_index import CountryIndex
+from downsample import TREND_MAX_POINTS, downsample_lines
+from excel_ingest import ingest_excel
+from generate_sample_data import generate_sample_data
+from startup import import_module
+from validate_data import validate_excel_file
+
+"""
+Benchmarks
+
+Times the hot paths of the generator, the validator and the dashboard at
+fixed scale tiers, without a Streamlit server:
+
+    python benchmarks.py                         # all tiers, compare with the baseline
+    python benchmarks.py --tiers 10k 1m          # selected tiers only
+    python benchmarks.py --save-baseline         # store these results as the baseline
+
+Each tier generates daily sample data of about the tier's row count with a
+fixed seed, so runs are comparable. Every benchmark reports the best of
+``--repeat`` runs. Results are written to JSON; when a baseline exists,
+benchmarks slower than the baseline by more than ``--tolerance`` are listed
+as regressions and the exit status is 1.
+
+Excel workbooks cannot hold more than about a million rows and writing one
+takes minutes, so the Excel benchmarks use the first ``--excel-rows`` rows
+of each tier.
+"""
+
+TIERS = {
+    '10k': 10_000,
+    '1m': 1_000_000,
+    '10m': 10_000_000,
+}
+SEED = 42
+REPEAT = 3
+EXCEL_ROWS = 100_000
+TOLERANCE = 0.25
+# Differences below this are timer noise, never regressions
+NOISE_SECONDS = 0.005
+# Longest history generated per country before adding synthetic countries (5 years)
+MAX_PERIODS = 1826
+RESULTS_FILE = 'benchmark_results.json'
+BASELINE_FILE = 'benchmark_baseline.json'
+TIME_RANGE = "Last 5 years"
+
+
+def tier_options(rows):
+    """Generator options giving about ``rows`` rows of daily data."""
+    per_period = len(generate_sample_data(rng=SEED, verbose=False, periods=1, freq='daily'))
+    periods = min(MAX_PERIODS, max(1, math.ceil(rows / per_period)))
+    multiplier = max(1, math.ceil(rows / (per_period * periods)))
+    periods = max(1, round(rows / (per_period * multiplier)))
+    return dict(rng=SEED, periods=periods, freq='daily', country_multiplier=multiplier)
+
+
+def measure(function, repeat=REPEAT):
+    """Run ``function`` ``repeat`` times; return its timings and last result."""
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return {'seconds': min(times), 'mean': sum(times) / len(times), 'repeat': repeat}, result
+
+
+def quiet(function):
+    """Call ``function`` with its printed output discarded."""
+    def call():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return function()
+    return call
+
+
+def write_excel(frame, path):
+    """Write a frame to an .xlsx workbook with openpyxl's streaming writer."""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet('Data')
+    worksheet.append(list(frame.columns))
+    columns = [
+        frame[c].dt.to_pydatetime() if pd.api.types.is_datetime64_any_dtype(frame[c])
+        else frame[c].astype(object).to_numpy()
+        for c in frame.columns
+    ]
+    for row in zip(*columns):
+        worksheet.append([float(v) if isinstance(v, np.floating) else v for v in row])
+    workbook.save(path)
+
+
+def run_tier(rows, repeat=REPEAT, excel_rows=EXCEL_ROWS, log=print):
+    """Run every benchmark for one tier; return ``{rows, options, benchmarks}``."""
+    options = tier_options(rows)
+    results = {}
+
+    def record(benchmark, function, times=repeat):
+        stats, value = measure(function, times)
+        results[benchmark] = stats
+        log(f"   ⏱️  {benchmark:<28} {stats['seconds']:>9.4f} s")
+        return value
+
+    # Generation
+    data = record('generate_sample_data', lambda: generate_sample_data(verbose=False, **options))
+
+    # Validation of an Excel workbook, streamed with openpyxl and from its columnar cache
+    with tempfile.TemporaryDirectory() as tmp:
+        workbook = Path(tmp) / 'benchmark.xlsx'
+        write_excel(data.head(excel_rows), workbook)
+        record('validate_excel.workbook', quiet(lambda: validate_excel_file(workbook)))
+        record('ingest_excel', lambda: ingest_excel(workbook, force=True))
+        record('validate_excel.ingested', quiet(lambda: validate_excel_file(workbook)))
+
+    # Per-country filter
+    index = record('country_filter.index', lambda: CountryIndex(data))
+    record('country_filter.lookup', lambda: [index.get(country) for country in index.countries])
+
+    # Rollups of each tab, and of all tabs together as the dashboard builds them
+    for tab, columns in TAB_COLUMNS.items():
+        if tab == 'raw':
+            continue
+        frame = data[['Country'] + columns]
+        record(f'cubes.{tab}', lambda frame=frame: build_cubes(frame))
+    cubes = record('cubes.all', lambda: build_cubes(data))
+
+    # Figures of the country with the most rows
+    country = data['Country'].value_counts().index[0]
+    country_cubes = dict(cubes[country])
+
+    def downsample():
+        for kind, by in (('brand_trend', 'Brand'), ('os_trend', 'OS')):
+            country_cubes[kind] = downsample_lines(cubes[country][kind], 'Date', 'MarketShare', by, TREND_MAX_POINTS)
+
+    record('downsample', downsample)
+    import_module('plotly.express')
+    figures = record('figures.build', lambda: charts.country_figures(country_cubes, TIME_RANGE))
+    record('figures.serialize', lambda: [figure.to_json() for figure in figures.values()])
+
+    return {'rows': len(data), 'options': {k: v for k, v in options.items() if k != 'rng'}, 'benchmarks': results}
+
+
+def environment():
+    """Versions and hardware the results were measured on."""
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+    }
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """Compare results with a baseline.
+
+    Returns a list of ``(tier, benchmark, baseline_seconds, seconds, ratio)``
+    for every benchmark present in both, and the subset that regressed.
+    """
+    rows, regressions = [], []
+    for tier, tier_results in results['tiers'].items():
+        base_tier = baseline.get('tiers', {}).get(tier)
+        if base_tier is None:
+            continue
+        for benchmark, stats in tier_results['benchmarks'].items():
+            base = base_tier['benchmarks'].get(benchmark)
+            if base is None:
+                continue
+            ratio = stats['seconds'] / base['seconds'] if base['seconds'] > 0 else math.inf
+            row = (tier, benchmark, base['seconds'], stats['seconds'], ratio)
+            rows.append(row)
+            if ratio > 1 + tolerance and stats['seconds'] - base['seconds'] > NOISE_SECONDS:
+                regressions.append(row)
+    return rows, regressions
+
+
+def main():
+    """Main function"""
+
+    parser = argparse.ArgumentParser(description="Benchmark data generation, validation, rollups and charts.")
+    parser.add_argument('--tiers', nargs='+', choices=list(TIERS), default=list(TIERS), help="Scale tiers to run")
+    parser.add_argument('--repeat', type=int, default=REPEAT, help="Runs per benchmark (the best is kept)")
+    parser.add_argument('--excel-rows', type=int, default=EXCEL_ROWS, help="Rows written to the Excel workbook")
+    parser.add_argument('--output', default=RESULTS_FILE, help="JSON file to write the results to")
+    parser.add_argument('--baseline', default=BASELINE_FILE, help="Baseline JSON file to compare with")
+    parser.add_argument('--save-baseline', action='store_true', help="Store the results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                        help="Allowed slowdown before a benchmark counts as a regression (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    results = {
+        'version': 1,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'environment': environment(),
+        'tiers': {},
+    }
+    for tier in args.tiers:
+        print(f"\n📏 Tier {tier} (~{TIERS[tier]:,} rows)")
+        results['tiers'][tier] = run_tier(TIERS[tier], args.repeat, args.excel_rows)
+        print(f"   📊 {results['tiers'][tier]['rows']:,} rows")
+
+    Path(args.output).write_text(json.dumps(results, indent=2))
+    print(f"\n💾 Results written to {args.output}")
+
+    if args.save_baseline:
+        Path(args.baseline).write_text(json.dumps(results, indent=2))
+        print(f"💾 Baseline written to {args.baseline}")
+        sys.exit(0)
+
+    if not Path(args.baseline).is_file():
+        print(f"ℹ️  No baseline at {args.baseline}; run with --save-baseline to create one")
+        sys.exit(0)
+
+    baseline = json.loads(Path(args.baseline).read_text())
+    rows, regressions = compare(results, baseline, args.tolerance)
+    print(f"\n📈 Compared with baseline from {baseline.get('created', 'unknown')}")
+    if baseline.get('environment') != results['environment']:
+        print("⚠️  The baseline was measured on a different environment")
+    for tier, benchmark, base, seconds, ratio in rows:
+        flag = "❌" if (tier, benchmark, base, seconds, ratio) in regressions else "✅"
+        print(f"   {flag} {tier:<4} {benchmark:<28} {base:>9.4f} s -> {seconds:>9.4f} s ({ratio:.2f}x)")
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} benchmark(s) slower than the baseline by more than {args.tolerance:.0%}")
+        sys.exit(1)
+    print("\n✅ No regressions")
+    sys.exit(0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+from downsample import max_points_per_line
+from startup import import_module
+
+"""
+Dashboard Charts
+
+Plotly figures for the dashboard tabs, built from the per-country rollups
+of aggregates.build_cubes, and for the Compare Countries tab from the
+rollups of aggregates.build_comparison. They live outside the Streamlit script so the
+benchmarks (benchmarks.py) can build the same figures headless.
+
+plotly.express is imported on the first figure (see startup.py). Trend
+frames are expected to be downsampled already (see downsample.py).
+"""
+
+# Lines with more points than this are drawn without markers
+MARKER_MAX_POINTS = 120
+
+
+def _trend_figure(trend, by, title):
+    px = import_module("plotly.express")
+    fig = px.line(
+        trend,
+        x="Date",
+        y="MarketShare",
+        color=by,
+        title=title,
+        markers=max_points_per_line(trend, by) <= MARKER_MAX_POINTS,
+        labels={"MarketShare": "Market Share", "Date": "Date"},
+    )
+    fig.update_layout(height=500, hovermode="x unified")
+    return fig
+
+
+def brand_trend_figure(brand_trend, time_range):
+    """Line chart of MarketShare per Brand over time."""
+    return _trend_figure(brand_trend, "Brand", f"Brand Market Share Trend ({time_range})")
+
+
+def os_trend_figure(os_trend, time_range):
+    """Line chart of MarketShare per OS over time."""
+    return _trend_figure(os_trend, "OS", f"Operating System Market Share Trend ({time_range})")
+
+
+def brand_share_figure(brand_data):
+    """Donut chart of MarketShare per Brand on the latest date."""
+    px = import_module("plotly.express")
+    fig = px.pie(
+        brand_data,
+        values="MarketShare",
+        names="Brand",
+        title="Current Brand Market Share Distribution",
+        hole=0.3,
+    )
+    fig.update_layout(height=500)
+    return fig
+
+
+def os_share_figure(os_data):
+    """Bar chart of MarketShare per OS on the latest date."""
+    px = import_module("plotly.express")
+    fig = px.bar(
+        os_data,
+        x="OS",
+        y="MarketShare",
+        title="Current OS Market Share",
+        labels={"MarketShare": "Market Share", "OS": "Operating System"},
+        color="OS",
+    )
+    fig.update_layout(height=500, showlegend=False)
+    return fig
+
+
+def brand_usage_figure(brand_usage):
+    """Horizontal bar chart of mean daily UsageHours per Brand."""
+    px = import_module("plotly.express")
+    fig = px.bar(
+        brand_usage,
+        x="UsageHours",
+        y="Brand",
+        title="Average Daily Usage by Brand (hours)",
+        labels={"UsageHours": "Hours per Day", "Brand": "Brand"},
+    )
+    fig.update_layout(height=400)
+    return fig
+
+
+def brand_users_figure(brand_users):
+    """Bar chart of the top brands by UsersMillions."""
+    px = import_module("plotly.express")
+    fig = px.bar(
+        brand_users,
+        x="Brand",
+        y="UsersMillions",
+        title="User Base by Brand (Millions)",
+        labels={"UsersMillions": "Users (Millions)", "Brand": "Brand"},
+        color="Brand",
+    )
+    fig.update_layout(height=400, showlegend=False)
+    return fig
+
+
+def country_figures(cubes, time_range):
+    """Build every dashboard figure for one country's rollups.
+
+    ``cubes`` is one country's entry of ``build_cubes`` with the trend
+    frames already downsampled. Returns ``{kind: figure}`` for each rollup
+    that exists and is not empty.
+    """
+    builders = {
+        "brand_trend": lambda frame: brand_trend_figure(frame, time_range),
+        "os_trend": lambda frame: os_trend_figure(frame, time_range),
+        "brand_share": brand_share_figure,
+        "os_share": os_share_figure,
+        "brand_usage": brand_usage_figure,
+        "brand_users": brand_users_figure,
+    }
+    return {
+        kind: build(cubes[kind])
+        for kind, build in builders.items()
+        if cubes.get(kind) is not None and not cubes[kind].empty
+    }
+
+
+def _comparison_height(frame):
+    return max(400, 40 * frame["Country"].nunique() + 150)
+
+
+def _stacked_by_country(frame, value, by, title, label):
+    px = import_module("plotly.express")
+    fig = px.bar(
+        frame,
+        x=value,
+        y="Country",
+        color=by,
+        orientation="h",
+        title=title,
+        labels={value: label},
+    )
+    fig.update_layout(height=_comparison_height(frame), barmode="stack", yaxis={"autorange": "reversed"})
+    return fig
+
+
+def comparison_brand_share_figure(brand_share):
+    """Stacked bars of MarketShare per Brand, one bar per country."""
+    return _stacked_by_country(brand_share, "MarketShare", "Brand", "Brand Market Share by Country", "Market Share")
+
+
+def comparison_os_share_figure(os_share):
+    """Stacked bars of MarketShare per OS, one bar per country."""
+    return _stacked_by_country(os_share, "MarketShare", "OS", "OS Market Share by Country", "Market Share")
+
+
+def comparison_users_figure(brand_users):
+    """Stacked bars of UsersMillions per Brand, one bar per country."""
+    return _stacked_by_country(brand_users, "UsersMillions", "Brand", "User Base by Country (Millions)", "Users (Millions)")
+
+
+def comparison_usage_figure(brand_usage):
+    """Heatmap of mean daily UsageHours, Country x Brand."""
+    px = import_module("plotly.express")
+    grid = brand_usage.pivot_table(index="Country", columns="Brand", values="UsageHours", observed=True, sort=False)
+    fig = px.imshow(
+        grid,
+        text_auto=".1f",
+        aspect="auto",
+        color_continuous_scale="Blues",
+        title="Average Daily Usage by Country and Brand (hours)",
+        labels={"color": "Hours per Day"},
+    )
+    fig.update_layout(height=_comparison_height(brand_usage))
+    return fig
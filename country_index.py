@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+from schema import enforce_schema
+
+"""
+Country Index
+
+Selecting a country with ``data[data["Country"] == country].copy()`` scans
+and compares every row and then copies the slice. The index below lays
+the rows out grouped by country once (the generator already emits them
+that way) and records each country's row range, so a selection is a
+positional slice that shares memory with the indexed frame.
+"""
+
+
+class CountryIndex:
+    """Row offsets of each country in a country-grouped frame.
+
+    Args:
+        df: Frame with a Country column. If its rows are not already
+            grouped by country they are stably reordered once.
+    """
+
+    def __init__(self, df):
+        codes, uniques = pd.factorize(df["Country"], sort=True)
+        run_starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if len(codes) else np.array([], int)
+
+        self.reordered = len(run_starts) != len(uniques)
+        if self.reordered:
+            order = np.argsort(codes, kind="stable")
+            df = df.take(order).reset_index(drop=True)
+            codes = codes[order]
+            run_starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+
+        run_stops = np.r_[run_starts[1:], len(codes)].astype(int)
+        self.frame = df
+        self._ranges = {
+            uniques[code]: (int(start), int(stop))
+            for code, start, stop in zip(codes[run_starts], run_starts, run_stops)
+        }
+        self.countries = sorted(self._ranges)
+
+    def __contains__(self, country):
+        return country in self._ranges
+
+    def __len__(self):
+        return len(self._ranges)
+
+    def row_range(self, country):
+        """Return the (start, stop) row positions of a country."""
+        return self._ranges[country]
+
+    def get(self, country):
+        """Return a country's rows as a positional slice (no scan, no deep copy).
+
+        The slice shares memory with the indexed frame and must be treated
+        as read-only. Unknown countries give an empty frame.
+        """
+        start, stop = self._ranges.get(country, (0, 0))
+        return self.frame.iloc[start:stop]
+
+    def append(self, rows):
+        """Return a new index with ``rows`` added after each country's rows.
+
+        The combined frame is assembled with one positional take from the
+        known row ranges, so nothing is re-sorted. This index is unchanged.
+        """
+        combined = enforce_schema(pd.concat([self.frame, rows], ignore_index=True))
+        new_index = CountryIndex.__new__(CountryIndex)
+
+        codes, uniques = pd.factorize(rows["Country"], sort=True)
+        order = np.argsort(codes, kind="stable") + len(self.frame)
+        counts = np.bincount(codes, minlength=len(uniques))
+        new_starts = np.r_[0, np.cumsum(counts)[:-1]]
+        new_ranges = {country: (int(start), int(start + count))
+                      for country, start, count in zip(uniques, new_starts, counts)}
+
+        # Keep the existing country order; new countries go at the end
+        existing = sorted(self._ranges, key=self._ranges.get)
+        added = sorted(set(new_ranges) - set(self._ranges))
+
+        pieces, ranges, position = [], {}, 0
+        for country in existing + added:
+            start = position
+            if country in self._ranges:
+                a, b = self._ranges[country]
+                pieces.append(np.arange(a, b))
+                position += b - a
+            if country in new_ranges:
+                a, b = new_ranges[country]
+                pieces.append(order[a:b])
+                position += b - a
+            ranges[country] = (start, position)
+
+        positions = np.concatenate(pieces) if pieces else np.array([], int)
+        new_index.frame = combined.take(positions).reset_index(drop=True)
+        new_index.reordered = False
+        new_index._ranges = ranges
+        new_index.countries = sorted(ranges)
+        return new_index
+
+    @property
+    def nbytes(self):
+        """Memory held by the index, for cache accounting.
+
+        The frame is always counted, whether the index built it or not:
+        the index keeps it alive for as long as it is cached, even after
+        the source frame has been evicted. Cache the frame through its
+        index only (``index.frame``), so it is not counted twice.
+        """
+        return 16 * len(self._ranges) + int(self.frame.memory_usage(deep=True).sum())
@@ -0,0 +1,345 @@
+import itertools
+import threading
+import uuid
+from pathlib import Path
+from urllib.parse import quote, unquote
+
+import pandas as pd
+from schema import COLUMNS, enforce_schema
+
+"""
+Columnar Data Store
+
+Reads and writes mobile market data as a Parquet dataset partitioned by
+Country (and optionally Year), e.g.
+
+    mobile_data_store/Country=Canada/Year=2025/part-0.parquet
+
+Reading one country only touches that country's partition, and only the
+requested columns are decoded.
+
+A single uncompressed Arrow IPC file (``.arrow``) can be used instead. It
+is memory-mapped, so every session and process on the host shares the same
+page-cache-backed buffers; only the selected country's rows are copied out.
+The readers below accept either a dataset directory or an IPC file.
+"""
+
+def _to_table(batch, partition_by_year):
+    """Convert a DataFrame or Arrow batch to a Table with partition columns."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if isinstance(batch, pd.DataFrame):
+        table = pa.Table.from_pandas(batch, preserve_index=False)
+    elif isinstance(batch, pa.RecordBatch):
+        table = pa.Table.from_batches([batch])
+    else:
+        table = batch
+
+    if partition_by_year and 'Year' not in table.column_names:
+        date = table['Date']
+        if pa.types.is_string(date.type) or pa.types.is_large_string(date.type):
+            year = pc.cast(pc.utf8_slice_codeunits(date, 0, 4), pa.int32())
+        else:
+            year = pc.cast(pc.year(date), pa.int32())
+        table = table.append_column('Year', year)
+    return table
+
+
+def write_dataset(data, root, partition_by_year=False, basename_template='part-{i}.parquet',
+                  existing_data_behavior='delete_matching'):
+    """Write data to a partitioned Parquet dataset.
+
+    Args:
+        data: A DataFrame, Arrow table/batch, or an iterable of them (e.g.
+            ``iter_sample_data``), which is written batch by batch.
+        root: Dataset directory.
+        partition_by_year: Partition by Year below Country.
+        basename_template: File name template; must be unique per writer
+            when several processes write into the same dataset.
+        existing_data_behavior: Passed to ``pyarrow.dataset.write_dataset``.
+            The default replaces partitions that are being written.
+    """
+    import pyarrow.dataset as ds
+
+    if isinstance(data, pd.DataFrame) or hasattr(data, 'schema'):
+        data = [data]
+
+    tables = (_to_table(batch, partition_by_year) for batch in data)
+    first = next(tables, None)
+    if first is None:
+        return
+
+    partition_columns = ['Country', 'Year'] if partition_by_year else ['Country']
+    batches = itertools.chain.from_iterable(
+        table.to_batches() for table in itertools.chain([first], tables)
+    )
+    ds.write_dataset(
+        batches,
+        root,
+        schema=first.schema,
+        format='parquet',
+        partitioning=partition_columns,
+        partitioning_flavor='hive',
+        basename_template=basename_template,
+        existing_data_behavior=existing_data_behavior,
+    )
+
+
+def append_dataset(data, root, partition_by_year=False):
+    """Append rows to a partitioned Parquet dataset without touching other files.
+
+    New files are added under the partitions of the countries in ``data``;
+    every other partition is left as is, so caches keyed by
+    ``partition_version`` stay valid for the countries that did not change.
+    Accepts the same inputs as ``write_dataset``. Returns the sorted list of
+    countries that received rows.
+    """
+    if _is_ipc(root):
+        raise ValueError(f"'{root}' is an Arrow IPC file, which cannot be appended to")
+    if isinstance(data, pd.DataFrame) or hasattr(data, 'schema'):
+        data = [data]
+
+    countries = set()
+
+    def tracked(batches):
+        for batch in batches:
+            table = _to_table(batch, False)
+            countries.update(table['Country'].unique().to_pylist())
+            yield table
+
+    write_dataset(
+        tracked(data),
+        root,
+        partition_by_year=partition_by_year,
+        basename_template=f'append-{uuid.uuid4().hex[:12]}-{{i}}.parquet',
+        existing_data_behavior='overwrite_or_ignore',
+    )
+    return sorted(countries)
+
+
+def write_ipc(data, path):
+    """Write data to an uncompressed Arrow IPC file for memory-mapped loading.
+
+    Accepts the same inputs as ``write_dataset`` and writes batch by batch.
+    """
+    import pyarrow as pa
+
+    if isinstance(data, pd.DataFrame) or hasattr(data, 'schema'):
+        data = [data]
+
+    tables = (_to_table(batch, False) for batch in data)
+    first = next(tables, None)
+    if first is None:
+        return
+
+    with pa.OSFile(str(path), 'wb') as sink, pa.ipc.new_file(sink, first.schema) as writer:
+        for table in itertools.chain([first], tables):
+            writer.write_table(table)
+
+
+# Memory-mapped IPC tables shared by all sessions in this process,
+# keyed by (path, mtime, size) so a rewritten file is mapped again
+_mapped_tables = {}
+_mapped_lock = threading.Lock()
+
+
+def _mapped_entry(path):
+    """Return the shared mapping entry for an IPC file, mapping it if needed."""
+    import pyarrow as pa
+
+    path = Path(path).resolve()
+    stat = path.stat()
+    key = (str(path), stat.st_mtime_ns, stat.st_size)
+
+    with _mapped_lock:
+        entry = _mapped_tables.get(key)
+        if entry is None:
+            source = pa.memory_map(str(path), 'r')
+            entry = {'table': pa.ipc.open_file(source).read_all(), 'countries': None}
+            for stale in [k for k in _mapped_tables if k[0] == key[0]]:
+                del _mapped_tables[stale]
+            _mapped_tables[key] = entry
+    return entry
+
+
+def open_ipc(path):
+    """Memory-map an Arrow IPC file and return it as a zero-copy Table."""
+    return _mapped_entry(path)['table']
+
+
+def _is_ipc(root):
+    return Path(root).is_file()
+
+
+def open_dataset(root):
+    """Open a partitioned dataset without reading any data."""
+    import pyarrow.dataset as ds
+
+    return ds.dataset(root, format='parquet', partitioning='hive')
+
+
+def dataset_version(root):
+    """Return a token that changes whenever a dataset's files change.
+
+    Used to key caches of data derived from a dataset.
+    """
+    root = Path(root)
+    if root.is_file():
+        stat = root.stat()
+        return (stat.st_mtime_ns, stat.st_size)
+    stats = [p.stat() for p in root.rglob('*.parquet')]
+    return (len(stats), max((s.st_mtime_ns for s in stats), default=0), sum(s.st_size for s in stats))
+
+
+def partition_version(root, country):
+    """Like ``dataset_version``, but only for one country's partition.
+
+    Appending to other countries leaves it unchanged. IPC files have no
+    partitions and return the version of the whole file.
+    """
+    root = Path(root)
+    if root.is_file():
+        return dataset_version(root)
+    partition = root / f'Country={quote(str(country), safe="")}'
+    stats = [p.stat() for p in partition.rglob('*.parquet')]
+    return (len(stats), max((s.st_mtime_ns for s in stats), default=0), sum(s.st_size for s in stats))
+
+
+def list_countries(root):
+    """List the countries in a dataset.
+
+    Partitioned datasets are listed from their directories; IPC files are
+    scanned once per mapping.
+    """
+    if _is_ipc(root):
+        import pyarrow.compute as pc
+
+        entry = _mapped_entry(root)
+        if entry['countries'] is None:
+            entry['countries'] = sorted(pc.unique(entry['table']['Country']).to_pylist())
+        return entry['countries']
+    return sorted(unquote(p.name.split('=', 1)[1]) for p in Path(root).glob('Country=*') if p.is_dir())
+
+
+def read_dataset(root, columns=None, filter=None):
+    """Read a dataset (or the part matching an Arrow filter) into a DataFrame.
+
+    Only the requested columns are decoded; by default the standard data
+    columns are returned in their usual order. The result follows the
+    compact schema (see ``schema``).
+    """
+    if _is_ipc(root):
+        import pyarrow.dataset as ds
+
+        dataset = ds.dataset(open_ipc(root))
+    else:
+        dataset = open_dataset(root)
+    if columns is None:
+        columns = [c for c in COLUMNS if c in dataset.schema.names]
+    return enforce_schema(dataset.to_table(columns=columns, filter=filter).to_pandas())
+
+
+def _since_value(date_type, since):
+    """Express a start date in the type of a Date column (ISO text or timestamp)."""
+    import pyarrow as pa
+
+    since = pd.Timestamp(since)
+    if pa.types.is_string(date_type) or pa.types.is_large_string(date_type):
+        return pa.scalar(since.strftime('%Y-%m-%d'), date_type)
+    return pa.scalar(since.to_datetime64()).cast(date_type)
+
+
+def date_filter(schema, since):
+    """Arrow filter for rows dated on or after ``since``.
+
+    On datasets partitioned by Year the Year partitions before ``since`` are
+    pruned without being opened; within the remaining files Parquet
+    row-group statistics skip what they can.
+    """
+    import pyarrow.dataset as ds
+
+    condition = ds.field('Date') >= _since_value(schema.field('Date').type, since)
+    if 'Year' in schema.names:
+        condition &= ds.field('Year') >= pd.Timestamp(since).year
+    return condition
+
+
+def read_country(root, country, columns=None, since=None):
+    """Read a single country's partition (or rows, for an IPC file).
+
+    With ``since``, only rows dated on or after it are read; the condition
+    is pushed down to the files (see ``date_filter``).
+    """
+    import pyarrow.dataset as ds
+
+    if _is_ipc(root):
+        import pyarrow.compute as pc
+
+        table = open_ipc(root)
+        mask = pc.equal(table['Country'], country)
+        if since is not None:
+            mask = pc.and_(mask, pc.greater_equal(table['Date'], _since_value(table.schema.field('Date').type, since)))
+        if columns is None:
+            columns = [c for c in COLUMNS if c in table.column_names]
+        return enforce_schema(table.select(columns).filter(mask).to_pandas())
+
+    condition = ds.field('Country') == country
+    if since is not None:
+        condition &= date_filter(open_dataset(root).schema, since)
+    return read_dataset(root, columns=columns, filter=condition)
+
+
+def read_countries(root, countries, columns=None, since=None):
+    """Read several countries' rows in one scan.
+
+    Only the listed countries' partitions are opened. With ``since``, only
+    rows dated on or after it are read (see ``date_filter``).
+    """
+    import pyarrow.dataset as ds
+
+    countries = list(countries)
+    if _is_ipc(root):
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        table = open_ipc(root)
+        mask = pc.is_in(table['Country'], value_set=pa.array(countries, pa.string()))
+        if since is not None:
+            mask = pc.and_(mask, pc.greater_equal(table['Date'], _since_value(table.schema.field('Date').type, since)))
+        if columns is None:
+            columns = [c for c in COLUMNS if c in table.column_names]
+        return enforce_schema(table.select(columns).filter(mask).to_pandas())
+
+    condition = ds.field('Country').isin(countries)
+    if since is not None:
+        condition &= date_filter(open_dataset(root).schema, since)
+    return read_dataset(root, columns=columns, filter=condition)
+
+
+def latest_date(root, country):
+    """Return a country's latest Date, or None if it has no dated rows.
+
+    For Parquet datasets this comes from row-group statistics, so no data
+    is read unless a file lacks them.
+    """
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+
+    if _is_ipc(root):
+        table = open_ipc(root)
+        dates = table['Date'].filter(pc.equal(table['Country'], country))
+        latest = pc.max(dates).as_py()
+    else:
+        latest = None
+        for fragment in open_dataset(root).get_fragments(filter=ds.field('Country') == country):
+            fragment.ensure_complete_metadata()
+            maxima = [((row_group.statistics or {}).get('Date') or {}).get('max')
+                      for row_group in fragment.row_groups]
+            if not maxima or None in maxima:
+                maxima = [pc.max(fragment.to_table(columns=['Date'])['Date']).as_py()]
+            for value in maxima:
+                if value is not None:
+                    value = pd.Timestamp(value)
+                    latest = value if latest is None else max(latest, value)
+    return None if latest is None else pd.Timestamp(latest)
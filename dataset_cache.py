@@ -0,0 +1,181 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+"""
+Process-wide Dataset Cache
+
+Streamlit re-executes the dashboard script on every interaction, but
+imported modules live for the whole server process. The cache below is
+therefore shared by every browser session: sessions keep only a key and
+all of them read the same frame.
+
+Cached values are shared, so callers must treat them as read-only.
+"""
+
+# Defaults can be tuned per deployment through environment variables
+DEFAULT_MAX_BYTES = int(os.environ.get("DATASET_CACHE_MAX_MB", "2048")) * 2**20
+DEFAULT_TTL_SECONDS = float(os.environ.get("DATASET_CACHE_TTL_SECONDS", "3600"))
+
+_MISSING = object()
+
+
+def estimate_size(value):
+    """Estimate the memory held by a cached value, in bytes.
+
+    Dicts, lists and tuples are sized with their contents, so nested
+    rollups (e.g. ``{country: {rollup: DataFrame}}``) count in full.
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class DatasetCache:
+    """Thread-safe LRU cache bounded by total size, entry count and age.
+
+    Args:
+        max_bytes: Evict least recently used entries above this total size.
+        max_entries: Optional cap on the number of entries.
+        ttl_seconds: Entries older than this are reloaded. None disables it.
+        sizeof: Function estimating an entry's size in bytes.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, max_entries=None, ttl_seconds=DEFAULT_TTL_SECONDS,
+                 sizeof=estimate_size):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._sizeof = sizeof
+        self._entries = OrderedDict()  # key -> (value, size, created)
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def _lookup(self, key):
+        """Return a live entry's value (refreshing its LRU position) or _MISSING."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISSING
+        value, size, created = entry
+        if self.ttl_seconds is not None and time.monotonic() - created > self.ttl_seconds:
+            del self._entries[key]
+            self._bytes -= size
+            self._expirations += 1
+            return _MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    def get(self, key, default=None):
+        """Return a cached value, or ``default`` if absent or expired."""
+        with self._lock:
+            value = self._lookup(key)
+            if value is _MISSING:
+                self._misses += 1
+                return default
+            self._hits += 1
+            return value
+
+    def put(self, key, value):
+        """Store a value, evicting least recently used entries as needed.
+
+        Values larger than the whole cache are not stored.
+        """
+        size = self._sizeof(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size, time.monotonic())
+            self._bytes += size
+            while self._entries and (
+                self._bytes > self.max_bytes
+                or (self.max_entries is not None and len(self._entries) > self.max_entries)
+            ):
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._evictions += 1
+
+    def get_or_create(self, key, loader):
+        """Return the cached value for ``key``, calling ``loader()`` on a miss.
+
+        Concurrent requests for the same missing key wait for a single load.
+        """
+        with self._lock:
+            value = self._lookup(key)
+            if value is not _MISSING:
+                self._hits += 1
+                return value
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                value = self._lookup(key)
+                if value is not _MISSING:
+                    self._hits += 1
+                    return value
+                self._misses += 1
+            try:
+                value = loader()
+                self.put(key, value)
+            finally:
+                with self._lock:
+                    self._key_locks.pop(key, None)
+        return value
+
+    def __contains__(self, key):
+        with self._lock:
+            return self._lookup(key) is not _MISSING
+
+    def __len__(self):
+        return len(self._entries)
+
+    def invalidate(self, key):
+        """Drop one entry if present."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[1]
+
+    def clear(self):
+        """Drop all entries (statistics are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Return hit/miss counters and memory use, for sizing the cache."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+            }
+
+
+# Shared by every session in this server process
+dataset_cache = DatasetCache()
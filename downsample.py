@@ -0,0 +1,92 @@
+import numpy as np
+
+"""
+Time-Series Downsampling
+
+Long daily histories put tens of thousands of points into each trend
+chart. A line chart cannot show more points than it is pixels wide, so
+each series is reduced with Largest-Triangle-Three-Buckets (LTTB) before
+plotting: the series is split into equal buckets and from each bucket the
+point forming the largest triangle with its neighbours is kept. Unlike
+bucket averages, this keeps peaks, dips and the first and last points.
+"""
+
+# Trend charts span the wide layout (roughly 1200 px); one point per two
+# pixels is indistinguishable from the full series
+TREND_MAX_POINTS = 600
+
+
+def lttb_indices(x, y, max_points):
+    """Return the positions of the points LTTB keeps, in ascending order.
+
+    ``x`` must be sorted. All positions are returned if the series already
+    has at most ``max_points`` points.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+
+    # max_points - 2 buckets between the fixed first and last points
+    edges = np.linspace(1, n - 1, max_points - 1).astype(int)
+    keep = np.empty(max_points, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+
+    selected = 0
+    for i in range(max_points - 2):
+        start, stop = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x = x[stop:edges[i + 2]].mean()
+            next_y = y[stop:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[n - 1], y[n - 1]
+
+        # Twice the triangle area for every candidate in the bucket
+        area = np.abs(
+            (x[selected] - next_x) * (y[start:stop] - y[selected])
+            - (x[selected] - x[start:stop]) * (next_y - y[selected])
+        )
+        area = np.nan_to_num(area, nan=-1.0)
+        selected = start + int(np.argmax(area))
+        keep[i + 1] = selected
+    return keep
+
+
+def downsample_lines(frame, x, y, by, max_points=TREND_MAX_POINTS):
+    """Downsample every line of a long-format frame with LTTB.
+
+    Args:
+        frame: One row per point, e.g. a ``brand_trend`` cube with Date,
+            Brand and MarketShare columns.
+        x: Column plotted on the x axis (numeric or datetime).
+        y: Column plotted on the y axis.
+        by: Column identifying the line (the chart's ``color``).
+        max_points: Points kept per line.
+
+    Returns the frame itself when no line exceeds ``max_points``.
+    """
+    if frame is None or frame.empty:
+        return frame
+
+    groups = frame.groupby(by, observed=True, sort=False).indices
+    if all(len(positions) <= max_points for positions in groups.values()):
+        return frame
+
+    x_values = frame[x].to_numpy()
+    if np.issubdtype(x_values.dtype, np.datetime64):
+        x_values = x_values.astype("datetime64[ns]").astype(np.int64)
+    y_values = frame[y].to_numpy(dtype=float, na_value=np.nan)
+
+    kept = []
+    for positions in groups.values():
+        positions = positions[np.argsort(x_values[positions], kind="stable")]
+        kept.append(positions[lttb_indices(x_values[positions], y_values[positions], max_points)])
+    return frame.take(np.sort(np.concatenate(kept))).reset_index(drop=True)
+
+
+def max_points_per_line(frame, by):
+    """Number of points on the longest line of a long-format frame."""
+    if frame is None or frame.empty:
+        return 0
+    return int(frame.groupby(by, observed=True).size().max())
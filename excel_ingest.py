@@ -0,0 +1,264 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+from pathlib import Path
+
+import pandas as pd
+from data_store import write_ipc
+from schema import CATEGORY_COLUMNS, DATE_COLUMN, DATE_DTYPE, METRIC_COLUMNS, METRIC_DTYPE, parse_dates
+
+"""
+Excel Ingestion
+
+Parsing a large workbook with openpyxl takes minutes. This module reads a
+workbook once, in read-only streaming mode, and converts every sheet into
+an uncompressed Arrow IPC file in a ``.columnar_cache`` directory next to
+the workbook. A small JSON manifest records the workbook's size and mtime;
+while those are unchanged the validator and the dashboard read the cached
+file (memory-mapped, see data_store.py) instead of the workbook.
+
+    python excel_ingest.py sample_mobile_data.xlsx
+
+Values are stored in the compact schema (see schema.py). A sheet whose
+values could not all be converted (e.g. text in a numeric column) is
+marked as lossy; the validator reads such sheets from the workbook so it
+can still report the bad values.
+"""
+
+CACHE_DIR_NAME = '.columnar_cache'
+CHUNK_ROWS = 100_000
+# Version 2: manifests written by concurrent ingests of version 1 could miss sheets
+# Version 3: dates are parsed with schema.DATE_FORMAT
+MANIFEST_VERSION = 3
+
+# One lock per workbook: Streamlit sessions are threads of one process, and
+# concurrent conversions of the same workbook would only repeat the work
+_ingest_locks = {}
+_ingest_locks_lock = threading.Lock()
+
+
+def iter_excel(file_path, chunk_rows=CHUNK_ROWS, sheet=None):
+    """Stream an Excel sheet in read-only mode, chunk_rows rows at a time.
+
+    ``sheet`` is a sheet name or index; by default the active sheet is read.
+    A sheet with a header but no rows gives one empty frame.
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        if sheet is None:
+            worksheet = workbook.active
+        elif isinstance(sheet, int):
+            worksheet = workbook.worksheets[sheet]
+        else:
+            worksheet = workbook[sheet]
+        rows = worksheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        header = [str(h) if h is not None else f"Unnamed: {i}" for i, h in enumerate(header)]
+        chunk = []
+        yielded = False
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == chunk_rows:
+                yield pd.DataFrame(chunk, columns=header)
+                yielded = True
+                chunk = []
+        if chunk or not yielded:
+            yield pd.DataFrame(chunk, columns=header)
+    finally:
+        workbook.close()
+
+
+def _sheet_names(file_path):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True)
+    try:
+        return workbook.sheetnames, workbook.worksheets.index(workbook.active)
+    finally:
+        workbook.close()
+
+
+def _to_columnar(chunk):
+    """Cast a raw sheet chunk to stable column types.
+
+    Returns ``(frame, lossless)``; ``lossless`` is False if any non-empty
+    value had to be dropped or rewritten. Text columns are kept as plain
+    strings (not categorical) so every chunk has the same Arrow schema.
+    """
+    casts = {}
+    lossless = True
+    for column in chunk.columns:
+        series = chunk[column]
+        present = series.notna()
+        if column == DATE_COLUMN:
+            # The validator's format, so the result does not depend on chunk boundaries
+            converted = parse_dates(series).astype(DATE_DTYPE)
+            lossless &= not (present & converted.isna()).any()
+        elif column in METRIC_COLUMNS:
+            converted = pd.to_numeric(series, errors='coerce').astype(METRIC_DTYPE)
+            lossless &= not (present & converted.isna()).any()
+        else:
+            if column in CATEGORY_COLUMNS and present.any():
+                if pd.api.types.is_object_dtype(series.dtype):
+                    lossless &= not (present & series.str.len().isna()).any()
+                elif not pd.api.types.is_string_dtype(series.dtype):
+                    lossless = False
+            converted = series.astype('string')
+        casts[column] = converted
+    return chunk.assign(**casts), bool(lossless)
+
+
+def cache_paths(file_path):
+    """Return the manifest path and the IPC file name prefix for a workbook."""
+    path = Path(file_path).resolve()
+    key = hashlib.sha1(str(path).encode()).hexdigest()[:12]
+    cache_dir = path.parent / CACHE_DIR_NAME
+    return cache_dir / f'{path.stem}-{key}.json', f'{path.stem}-{key}'
+
+
+def load_manifest(file_path):
+    """Return the ingestion manifest if it matches the workbook on disk, else None."""
+    manifest_path, _ = cache_paths(file_path)
+    try:
+        manifest = json.loads(manifest_path.read_text())
+        stat = os.stat(file_path)
+    except (OSError, ValueError):
+        return None
+    if (manifest.get('version') != MANIFEST_VERSION
+            or manifest['size'] != stat.st_size or manifest['mtime_ns'] != stat.st_mtime_ns):
+        return None
+    if not all((manifest_path.parent / sheet['file']).exists() for sheet in manifest['sheets']):
+        return None
+    return manifest
+
+
+def _temporary_path(target):
+    """A file next to ``target`` that no other process or thread writes to."""
+    return target.with_name(f'.{target.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+
+
+def ingest_excel(file_path, chunk_rows=CHUNK_ROWS, force=False):
+    """Convert every sheet of a workbook to a cached Arrow IPC file.
+
+    Nothing is read if an up-to-date conversion already exists (unless
+    ``force``). Returns the manifest: source size/mtime, the active sheet
+    index and per-sheet ``name``, ``file``, ``rows`` and ``lossless``.
+    Threads converting the same workbook wait for each other, and the
+    later ones reuse the result.
+    """
+    if not force:
+        manifest = load_manifest(file_path)
+        if manifest is not None:
+            return manifest
+
+    with _ingest_locks_lock:
+        lock = _ingest_locks.setdefault(str(Path(file_path).resolve()), threading.Lock())
+    with lock:
+        if not force:
+            manifest = load_manifest(file_path)
+            if manifest is not None:
+                return manifest
+        return _ingest(file_path, chunk_rows)
+
+
+def _ingest(file_path, chunk_rows):
+    """Convert a workbook and write its manifest (see ``ingest_excel``)."""
+    stat = os.stat(file_path)
+    manifest_path, prefix = cache_paths(file_path)
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    names, active = _sheet_names(file_path)
+
+    sheets = []
+    for index, name in enumerate(names):
+        info = {'name': name, 'file': f'{prefix}-{index}.arrow', 'rows': 0, 'lossless': True}
+        chunks = []
+
+        def converted(index=index, info=info, chunks=chunks):
+            for chunk in iter_excel(file_path, chunk_rows, sheet=index):
+                frame, lossless = _to_columnar(chunk)
+                info['rows'] += len(frame)
+                info['lossless'] &= lossless
+                chunks.append(len(frame))
+                yield frame
+
+        # Write next to the target and rename, so readers never map a partial file
+        target = manifest_path.parent / info['file']
+        temporary = _temporary_path(target)
+        try:
+            write_ipc(converted(), temporary)
+            if not chunks:
+                # Not even a header row: there is nothing to cache
+                continue
+            if not temporary.exists():
+                raise OSError(f"Sheet '{name}' of '{file_path}' was converted but not written")
+            os.replace(temporary, target)
+        finally:
+            temporary.unlink(missing_ok=True)
+        sheets.append(info)
+
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'source': str(Path(file_path).resolve()),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'active': names[active] if 0 <= active < len(names) else None,
+        'sheets': sheets,
+    }
+    temporary = _temporary_path(manifest_path)
+    temporary.write_text(json.dumps(manifest, indent=2))
+    os.replace(temporary, manifest_path)
+    return manifest
+
+
+def cached_sheet(file_path, sheet=None, lossless=False, ingest=False):
+    """Return the cached IPC file for a workbook sheet, or None if there is none.
+
+    Args:
+        file_path: The Excel workbook.
+        sheet: Sheet name; the active sheet by default.
+        lossless: Only return sheets whose values converted without loss.
+        ingest: Convert the workbook first if its cache is missing or stale.
+    """
+    manifest = ingest_excel(file_path) if ingest else load_manifest(file_path)
+    if manifest is None:
+        return None
+    name = manifest['active'] if sheet is None else sheet
+    for info in manifest['sheets']:
+        if info['name'] == name and (info['lossless'] or not lossless):
+            return cache_paths(file_path)[0].parent / info['file']
+    return None
+
+
+def main():
+    """Main function"""
+
+    parser = argparse.ArgumentParser(description="Convert Excel workbooks to cached Arrow files.")
+    parser.add_argument('paths', nargs='+', help="Excel workbooks to ingest")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help="Rows read per chunk")
+    parser.add_argument('--force', action='store_true', help="Convert even if the cache is up to date")
+    args = parser.parse_args()
+
+    failed = False
+    for path in args.paths:
+        if not Path(path).is_file():
+            print(f"❌ ERROR: File '{path}' not found!", file=sys.stderr)
+            failed = True
+            continue
+        fresh = not args.force and load_manifest(path) is not None
+        manifest = ingest_excel(path, args.chunk_rows, args.force)
+        print(f"{'♻️  Up to date' if fresh else '✅ Ingested'}: {path}")
+        for info in manifest['sheets']:
+            active = " (active)" if info['name'] == manifest['active'] else ""
+            lossy = "" if info['lossless'] else " - some values could not be converted"
+            print(f"   📄 {info['name']}{active}: {info['rows']} rows -> {info['file']}{lossy}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+import os
+
+from dataset_cache import DEFAULT_TTL_SECONDS, DatasetCache
+
+"""
+Plotly Figure Cache
+
+Building a figure with plotly.express costs far more than rendering it:
+px validates and groups the data and constructs every trace. Figures are
+therefore built once per (dataset fingerprint, country, chart kind) and
+shared by all sessions in the process.
+
+The cache holds the validated Figure objects rather than their JSON:
+Streamlit re-validates anything that is not already a Figure, which
+would cost about as much as building it again. Entries are sized by their
+serialized spec, which is what each render sends to the browser, and the
+least recently used figures are evicted above FIGURE_CACHE_MAX_MB.
+"""
+
+DEFAULT_MAX_BYTES = int(os.environ.get("FIGURE_CACHE_MAX_MB", "256")) * 2**20
+
+
+def figure_size(figure):
+    """Size of a figure's serialized spec, in bytes."""
+    import plotly.io as pio
+
+    return len(pio.to_json(figure, validate=False))
+
+
+figure_cache = DatasetCache(max_bytes=DEFAULT_MAX_BYTES, ttl_seconds=DEFAULT_TTL_SECONDS, sizeof=figure_size)
+
+
+def cached_figure(dataset_key, country, kind, build):
+    """Return the figure of one chart, calling ``build()`` on a miss.
+
+    ``dataset_key`` must change whenever the data behind the chart does
+    (the dashboard uses its rollup cache key). The returned figure is
+    shared and must not be modified.
+    """
+    return figure_cache.get_or_create((dataset_key, country, kind), build)
@@ -1,6 +1,13 @@
 import pandas as pd
 import numpy as np
+import argparse
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
+from pathlib import Path
+from data_store import write_dataset, write_ipc
+from schema import DATE_DTYPE, METRIC_DTYPE
 
 """
 Sample Mobile Phone Market Data Generator
@@ -9,210 +16,693 @@ This script creates sample mobile phone market data by country
 and returns it as a pandas DataFrame.
 """
 
-def generate_sample_data():
-    """Generate sample mobile phone market data and return as DataFrame."""
-
-    # Define countries and their characteristics
-    countries = {
-        'United States': {
-            'primary_brands': ['Apple', 'Samsung', 'Google', 'Motorola'],
-            'primary_os': ['iOS', 'Android'],
-            'base_users': 280,
-            'growth_rate': 0.02,
-            'ios_preference': 0.58,
-            'top_brands': {
-                'Apple': 0.51,
-                'Samsung': 0.24,
-                'Google': 0.13,
-                'Motorola': 0.08,
-                'Others': 0.04
-            }
-        },
-        'Canada': {
-            'primary_brands': ['Apple', 'Samsung', 'Google'],
-            'primary_os': ['iOS', 'Android'],
-            'base_users': 35,
-            'growth_rate': 0.015,
-            'ios_preference': 0.60,
-            'top_brands': {
-                'Apple': 0.61,
-                'Samsung': 0.23,
-                'Google': 0.08,
-                'Others': 0.08
-            }
-        },
-        'United Kingdom': {
-            'primary_brands': ['Apple', 'Samsung', 'Google'],
-            'primary_os': ['iOS', 'Android'],
-            'base_users': 55,
-            'growth_rate': 0.01,
-            'ios_preference': 0.57,
-            'top_brands': {
-                'Apple': 0.51,
-                'Samsung': 0.31,
-                'Google': 0.05,
-                'Others': 0.13
-            }
-        },
-        'Germany': {
-            'primary_brands': ['Samsung', 'Apple', 'Xiaomi'],
-            'primary_os': ['Android', 'iOS'],
-            'base_users': 65,
-            'growth_rate': 0.005,
-            'ios_preference': 0.37,
-            'top_brands': {
-                'Samsung': 0.34,
-                'Apple': 0.37,
-                'Xiaomi': 0.12,
-                'Others': 0.17
-            }
-        },
-        'China': {
-            'primary_brands': ['Huawei', 'Oppo', 'Vivo', 'Xiaomi', 'Apple'],
-            'primary_os': ['Android', 'iOS'],
-            'base_users': 975,
-            'growth_rate': 0.03,
-            'ios_preference': 0.24,
-            'top_brands': {
-                'Huawei': 0.20,
-                'Oppo': 0.18,
-                'Vivo': 0.15,
-                'Xiaomi': 0.13,
-                'Apple': 0.14,
-                'Others': 0.20
-            }
-        },
-        'India': {
-            'primary_brands': ['Xiaomi', 'Realme', 'Oppo', 'Samsung', 'Apple'],
-            'primary_os': ['Android', 'iOS'],
-            'base_users': 659,
-            'growth_rate': 0.08,
-            'ios_preference': 0.04,
-            'top_brands': {
-                'Xiaomi': 0.19,
-                'Realme': 0.14,
-                'Oppo': 0.12,
-                'Samsung': 0.18,
-                'Apple': 0.04,
-                'Vivo': 0.10,
-                'Others': 0.23
-            }
-        },
-        'Japan': {
-            'primary_brands': ['Apple', 'Samsung', 'Sharp'],
-            'primary_os': ['iOS', 'Android'],
-            'base_users': 97,
-            'growth_rate': 0.01,
-            'ios_preference': 0.69,
-            'top_brands': {
-                'Apple': 0.59,
-                'Samsung': 0.07,
-                'Sharp': 0.10,
-                'Others': 0.24
-            }
-        },
-        'Brazil': {
-            'primary_brands': ['Samsung', 'Motorola', 'Xiaomi'],
-            'primary_os': ['Android', 'iOS'],
-            'base_users': 143,
-            'growth_rate': 0.05,
-            'ios_preference': 0.16,
-            'top_brands': {
-                'Samsung': 0.37,
-                'Motorola': 0.22,
-                'Xiaomi': 0.18,
-                'Oppo': 0.10,
-                'Others': 0.13
-            }
-        },
-        'Australia': {
-            'primary_brands': ['Apple', 'Samsung', 'Google'],
-            'primary_os': ['iOS', 'Android'],
-            'base_users': 20,
-            'growth_rate': 0.02,
-            'ios_preference': 0.57,
-            'top_brands': {
-                'Apple': 0.57,
-                'Samsung': 0.26,
-                'Google': 0.07,
-                'Others': 0.10
-            }
+# Define countries and their characteristics
+COUNTRIES = {
+    'United States': {
+        'primary_brands': ['Apple', 'Samsung', 'Google', 'Motorola'],
+        'primary_os': ['iOS', 'Android'],
+        'base_users': 280,
+        'growth_rate': 0.02,
+        'ios_preference': 0.58,
+        'top_brands': {
+            'Apple': 0.51,
+            'Samsung': 0.24,
+            'Google': 0.13,
+            'Motorola': 0.08,
+            'Others': 0.04
+        }
+    },
+    'Canada': {
+        'primary_brands': ['Apple', 'Samsung', 'Google'],
+        'primary_os': ['iOS', 'Android'],
+        'base_users': 35,
+        'growth_rate': 0.015,
+        'ios_preference': 0.60,
+        'top_brands': {
+            'Apple': 0.61,
+            'Samsung': 0.23,
+            'Google': 0.08,
+            'Others': 0.08
+        }
+    },
+    'United Kingdom': {
+        'primary_brands': ['Apple', 'Samsung', 'Google'],
+        'primary_os': ['iOS', 'Android'],
+        'base_users': 55,
+        'growth_rate': 0.01,
+        'ios_preference': 0.57,
+        'top_brands': {
+            'Apple': 0.51,
+            'Samsung': 0.31,
+            'Google': 0.05,
+            'Others': 0.13
+        }
+    },
+    'Germany': {
+        'primary_brands': ['Samsung', 'Apple', 'Xiaomi'],
+        'primary_os': ['Android', 'iOS'],
+        'base_users': 65,
+        'growth_rate': 0.005,
+        'ios_preference': 0.37,
+        'top_brands': {
+            'Samsung': 0.34,
+            'Apple': 0.37,
+            'Xiaomi': 0.12,
+            'Others': 0.17
+        }
+    },
+    'China': {
+        'primary_brands': ['Huawei', 'Oppo', 'Vivo', 'Xiaomi', 'Apple'],
+        'primary_os': ['Android', 'iOS'],
+        'base_users': 975,
+        'growth_rate': 0.03,
+        'ios_preference': 0.24,
+        'top_brands': {
+            'Huawei': 0.20,
+            'Oppo': 0.18,
+            'Vivo': 0.15,
+            'Xiaomi': 0.13,
+            'Apple': 0.14,
+            'Others': 0.20
+        }
+    },
+    'India': {
+        'primary_brands': ['Xiaomi', 'Realme', 'Oppo', 'Samsung', 'Apple'],
+        'primary_os': ['Android', 'iOS'],
+        'base_users': 659,
+        'growth_rate': 0.08,
+        'ios_preference': 0.04,
+        'top_brands': {
+            'Xiaomi': 0.19,
+            'Realme': 0.14,
+            'Oppo': 0.12,
+            'Samsung': 0.18,
+            'Apple': 0.04,
+            'Vivo': 0.10,
+            'Others': 0.23
         }
+    },
+    'Japan': {
+        'primary_brands': ['Apple', 'Samsung', 'Sharp'],
+        'primary_os': ['iOS', 'Android'],
+        'base_users': 97,
+        'growth_rate': 0.01,
+        'ios_preference': 0.69,
+        'top_brands': {
+            'Apple': 0.59,
+            'Samsung': 0.07,
+            'Sharp': 0.10,
+            'Others': 0.24
+        }
+    },
+    'Brazil': {
+        'primary_brands': ['Samsung', 'Motorola', 'Xiaomi'],
+        'primary_os': ['Android', 'iOS'],
+        'base_users': 143,
+        'growth_rate': 0.05,
+        'ios_preference': 0.16,
+        'top_brands': {
+            'Samsung': 0.37,
+            'Motorola': 0.22,
+            'Xiaomi': 0.18,
+            'Oppo': 0.10,
+            'Others': 0.13
+        }
+    },
+    'Australia': {
+        'primary_brands': ['Apple', 'Samsung', 'Google'],
+        'primary_os': ['iOS', 'Android'],
+        'base_users': 20,
+        'growth_rate': 0.02,
+        'ios_preference': 0.57,
+        'top_brands': {
+            'Apple': 0.57,
+            'Samsung': 0.26,
+            'Google': 0.07,
+            'Others': 0.10
+        }
+    }
+}
+
+# Base daily usage hours by brand (varies by brand and region)
+BRAND_BASE_USAGE = {
+    'Apple': 5.5,
+    'Samsung': 4.8,
+    'Xiaomi': 4.5,
+}
+DEFAULT_BASE_USAGE = 4.2
+
+# Days between consecutive data points for each supported frequency
+FREQUENCIES = {
+    'daily': 1,
+    'weekly': 7,
+    'monthly': 30,
+}
+
+# Noise is drawn in fixed (country block x period block) cells, each with its
+# own seed stream, so the same rows come out however the work is chunked.
+COUNTRY_BLOCK = 32
+PERIOD_BLOCK = 16
+# Noise cells kept for reuse while streaming (about 50 KB each)
+NOISE_CACHE_CELLS = 256
+
+# Target number of rows per generated chunk
+CHUNK_ROWS = 1_000_000
+
+
+def _brand_os(country, brand):
+    """Determine the OS for a brand in a country."""
+    if brand == 'Apple':
+        return 'iOS'
+    elif brand in ['Huawei'] and country == 'China':
+        return 'HarmonyOS'
+    return 'Android'
+
+
+def _profile_table(countries, country_multiplier=1):
+    """Flatten country profiles into padded (country, brand slot) arrays.
+
+    The generator works on integer codes into these tables so that every
+    output column can be built with a single NumPy take. With
+    ``country_multiplier > 1`` each profile is repeated as synthetic
+    countries ("Canada 2", "Canada 3", ...).
+    """
+    country_names = list(countries)
+    n_countries = len(country_names)
+    n_slots = max(len(info['top_brands']) for info in countries.values())
+
+    brand_names = []
+    os_names = []
+    brand_code = np.zeros((n_countries, n_slots), dtype=np.int64)
+    os_code = np.zeros((n_countries, n_slots), dtype=np.int64)
+    share = np.zeros((n_countries, n_slots))
+    base_usage = np.zeros((n_countries, n_slots))
+    valid = np.zeros((n_countries, n_slots), dtype=bool)
+
+    for i, country in enumerate(country_names):
+        for slot, (brand, market_share) in enumerate(countries[country]['top_brands'].items()):
+            os_name = _brand_os(country, brand)
+            if brand not in brand_names:
+                brand_names.append(brand)
+            if os_name not in os_names:
+                os_names.append(os_name)
+            brand_code[i, slot] = brand_names.index(brand)
+            os_code[i, slot] = os_names.index(os_name)
+            share[i, slot] = market_share
+            base_usage[i, slot] = BRAND_BASE_USAGE.get(brand, DEFAULT_BASE_USAGE)
+            valid[i, slot] = True
+
+    names = np.array(country_names, dtype=object)
+    if country_multiplier > 1:
+        copies = [names] + [names + f' {k}' for k in range(2, country_multiplier + 1)]
+        names = np.concatenate(copies)
+
+    def tile(values):
+        return np.tile(values, (country_multiplier,) + (1,) * (values.ndim - 1))
+
+    return {
+        'country_names': names,
+        'brand_names': np.array(brand_names, dtype=object),
+        'os_names': np.array(os_names, dtype=object),
+        'base_users': tile(np.array([countries[c]['base_users'] for c in country_names], dtype=float)),
+        'growth_rate': tile(np.array([countries[c]['growth_rate'] for c in country_names], dtype=float)),
+        'brand_code': tile(brand_code),
+        'os_code': tile(os_code),
+        'share': tile(share),
+        'base_usage': tile(base_usage),
+        'valid': tile(valid),
+    }
+
+
+def _seed_sequence(rng):
+    """Turn a seed, SeedSequence or Generator into a root SeedSequence."""
+    if isinstance(rng, np.random.SeedSequence):
+        return rng
+    if isinstance(rng, np.random.Generator):
+        return np.random.SeedSequence(rng.integers(0, 2**32, size=4))
+    return np.random.SeedSequence(rng)
+
+
+def _build_plan(periods=13, freq='monthly', start_date=None, country_multiplier=1, rng=None, first_period=0):
+    """Resolve generation parameters into a plan shared by every chunk.
+
+    ``first_period`` skips that many periods from ``start_date``: dates and
+    user growth continue from there, which is how new periods are appended
+    to an existing dataset.
+    """
+    if freq not in FREQUENCIES:
+        raise ValueError(f"Unknown frequency '{freq}', expected one of {', '.join(FREQUENCIES)}")
+    if periods < 1:
+        raise ValueError("periods must be at least 1")
+    if country_multiplier < 1:
+        raise ValueError("country_multiplier must be at least 1")
+    if first_period < 0:
+        raise ValueError("first_period must not be negative")
+
+    if start_date is None:
+        start_date = datetime.now() - timedelta(days=365)
+
+    table = _profile_table(COUNTRIES, country_multiplier)
+    n_countries = len(table['country_names'])
+    step_days = FREQUENCIES[freq]
+
+    return {
+        'table': table,
+        # Built once: every chunk shares them, so concatenating chunks needs no category hashing per chunk
+        'dtypes': {
+            name: pd.CategoricalDtype(table[f'{name.lower()}_names'])
+            for name in ('Country', 'Brand', 'OS')
+        },
+        'n_countries': n_countries,
+        'n_periods': periods,
+        'first_period': first_period,
+        'step_days': step_days,
+        # Growth rates are monthly; scale them to the period length
+        'months_per_period': step_days / 30,
+        'start': np.datetime64(pd.Timestamp(start_date).date(), 'D'),
+        'seed': _seed_sequence(rng),
+        'country_block': min(COUNTRY_BLOCK, n_countries),
+        # Fixed, so a period's noise does not depend on how many were requested
+        'period_block': PERIOD_BLOCK,
     }
 
-    # Generate data
-    data_records = []
-    start_date = datetime.now() - timedelta(days=365)
-
-    for country, info in countries.items():
-        # Generate 12 monthly data points
-        for month_offset in range(0, 13):
-            current_date = start_date + timedelta(days=30 * month_offset)
-
-            # Calculate users for this month
-            month_users = info['base_users'] * (1 + info['growth_rate']) ** month_offset
-
-            # Add some randomness
-            noise = np.random.normal(1, 0.02)
-            month_users *= noise
-
-            # Generate brand data
-            for brand, market_share in info['top_brands'].items():
-                # Add slight variation over time
-                variation = np.random.normal(1, 0.05)
-                adjusted_share = max(
-                    0.5,
-                    min(8, market_share * variation * 100)
-                )  # Market share as percentage
-
-                # Determine OS for this brand
-                if brand == 'Apple':
-                    os_name = 'iOS'
-                elif brand in ['Huawei'] and country == 'China':
-                    os_name = 'HarmonyOS'
-                else:
-                    os_name = 'Android'
-
-                # Calculate users for this brand
-                brand_users = month_users * (market_share / 100)
-
-                # Generate usage hours (varies by brand and region)
-                if brand == 'Apple':
-                    base_usage = 5.5
-                elif brand == 'Samsung':
-                    base_usage = 4.8
-                elif brand == 'Xiaomi':
-                    base_usage = 4.5
-                else:
-                    base_usage = 4.2
-
-                usage_variation = np.random.normal(1, 0.1)
-                usage_hours = max(2, base_usage * usage_variation)
-
-                data_records.append({
-                    'Country': country,
-                    'Date': current_date.strftime('%Y-%m-%d'),
-                    'Brand': brand,
-                    'OS': os_name,
-                    'Market_Share': adjusted_share,
-                    'Users_Millions': round(brand_users, 2),
-                    'Usage_Hours': round(usage_hours, 2)
-                })
+
+def _draw_noise(plan, country_start, country_stop, period_start, period_stop, cells=None):
+    """Draw the three noise terms for a country x period range.
+
+    Each cell of the fixed block grid gets an independent stream spawned from
+    the root SeedSequence and is always drawn in full, so results do not
+    depend on how callers split the ranges.
+
+    ``cells`` is an optional dict of recently drawn cells, shared between
+    calls: cells found there are reused instead of drawn again, and the
+    least recently used are dropped beyond ``NOISE_CACHE_CELLS``. Chunks
+    smaller than a cell then do not draw it again for every chunk.
+    """
+    root = plan['seed']
+    # The block grid is laid over absolute periods
+    period_start += plan['first_period']
+    period_stop += plan['first_period']
+    n_slots = plan['table']['share'].shape[1]
+    cb, pb = plan['country_block'], plan['period_block']
+    shape = (country_stop - country_start, period_stop - period_start)
+
+    month_noise = np.empty(shape)
+    variation = np.empty(shape + (n_slots,))
+    usage_variation = np.empty(shape + (n_slots,))
+
+    for g in range(country_start // cb, (country_stop - 1) // cb + 1):
+        for b in range(period_start // pb, (period_stop - 1) // pb + 1):
+            if cells is not None and (g, b) in cells:
+                cell_noise, cell_variation, cell_usage = cells[g, b] = cells.pop((g, b))
+            else:
+                seq = np.random.SeedSequence(root.entropy, spawn_key=root.spawn_key + (g, b))
+                cell_rng = np.random.default_rng(seq)
+                cell_noise = cell_rng.normal(1, 0.02, size=(cb, pb))
+                cell_variation = cell_rng.normal(1, 0.05, size=(cb, pb, n_slots))
+                cell_usage = cell_rng.normal(1, 0.1, size=(cb, pb, n_slots))
+                if cells is not None:
+                    cells[g, b] = cell_noise, cell_variation, cell_usage
+                    if len(cells) > NOISE_CACHE_CELLS:
+                        del cells[next(iter(cells))]
+
+            c0, c1 = max(country_start, g * cb), min(country_stop, (g + 1) * cb)
+            p0, p1 = max(period_start, b * pb), min(period_stop, (b + 1) * pb)
+            out = (slice(c0 - country_start, c1 - country_start), slice(p0 - period_start, p1 - period_start))
+            cell = (slice(c0 - g * cb, c1 - g * cb), slice(p0 - b * pb, p1 - b * pb))
+            month_noise[out] = cell_noise[cell]
+            variation[out] = cell_variation[cell]
+            usage_variation[out] = cell_usage[cell]
+
+    return month_noise, variation, usage_variation
+
+
+def _generate_chunk(plan, country_start, country_stop, period_start, period_stop, cells=None):
+    """Vectorized generation engine for one country x period range.
+
+    Values live on a padded (country, period, brand slot) grid; the valid
+    cells are flattened in C order, which yields the same row order as the
+    original per-row loop: country by country, period by period, brand by
+    brand. ``cells`` is passed on to ``_draw_noise``.
+    """
+    table = plan['table']
+    countries = slice(country_start, country_stop)
+    offsets = np.arange(period_start, period_stop) + plan['first_period']
+
+    month_noise, variation, usage_variation = _draw_noise(
+        plan, country_start, country_stop, period_start, period_stop, cells
+    )
+
+    # Calculate users per country and period, with some randomness
+    growth = (1 + table['growth_rate'][countries, None]) ** (offsets * plan['months_per_period'])[None, :]
+    month_users = table['base_users'][countries, None] * growth * month_noise
+
+    # Market share as percentage, with slight variation over time
+    share = table['share'][countries, None, :]
+    adjusted_share = np.clip(share * variation * 100, 0.5, 8)
+
+    # Users for each brand
+    brand_users = month_users[:, :, None] * (share / 100)
+
+    # Usage hours (varies by brand and region)
+    usage_hours = np.maximum(2, table['base_usage'][countries, None, :] * usage_variation)
+
+    valid = np.broadcast_to(table['valid'][countries, None, :], adjusted_share.shape)
+    country_idx, period_idx, slot_idx = np.nonzero(valid)
+    profile = (country_idx + country_start, slot_idx)
+
+    dates = (plan['start'] + offsets * plan['step_days']).astype(DATE_DTYPE)
+
+    # Compact schema: categories share the plan's full tables so chunks
+    # concatenate without falling back to object columns
+    return pd.DataFrame({
+        'Country': pd.Categorical.from_codes(country_idx + country_start, dtype=plan['dtypes']['Country']),
+        'Date': dates[period_idx],
+        'Brand': pd.Categorical.from_codes(table['brand_code'][profile], dtype=plan['dtypes']['Brand']),
+        'OS': pd.Categorical.from_codes(table['os_code'][profile], dtype=plan['dtypes']['OS']),
+        'Market_Share': adjusted_share[valid].astype(METRIC_DTYPE),
+        'Users_Millions': np.round(brand_users[valid], 2).astype(METRIC_DTYPE),
+        'Usage_Hours': np.round(usage_hours[valid], 2).astype(METRIC_DTYPE),
+    })
+
+
+def _chunk_ranges(plan, chunk_rows=CHUNK_ROWS):
+    """Split a plan into (country range, period range) chunks in row order."""
+    n_countries, n_periods = plan['n_countries'], plan['n_periods']
+    rows_per_country = n_periods * plan['table']['share'].shape[1]
+    countries_per_chunk = max(1, chunk_rows // rows_per_country)
+    if countries_per_chunk >= plan['country_block']:
+        countries_per_chunk -= countries_per_chunk % plan['country_block']
+
+    if countries_per_chunk > 1:
+        for c0 in range(0, n_countries, countries_per_chunk):
+            yield c0, min(c0 + countries_per_chunk, n_countries), 0, n_periods
+    else:
+        # A single country is larger than a chunk: split its periods as well
+        periods_per_chunk = max(1, chunk_rows // plan['table']['share'].shape[1])
+        if periods_per_chunk >= plan['period_block']:
+            periods_per_chunk -= periods_per_chunk % plan['period_block']
+        for c0 in range(n_countries):
+            for p0 in range(0, n_periods, periods_per_chunk):
+                yield c0, c0 + 1, p0, min(p0 + periods_per_chunk, n_periods)
+
+
+def _iter_chunks(plan, chunk_rows=CHUNK_ROWS):
+    """Yield the dataset described by a plan as consecutive DataFrames."""
+    # Chunks smaller than a noise cell reuse it instead of drawing it again
+    cells = {}
+    for bounds in _chunk_ranges(plan, chunk_rows):
+        yield _generate_chunk(plan, *bounds, cells=cells)
+
+
+def _shard_ranges(plan, n_shards):
+    """Split a plan into about ``n_shards`` shards aligned to the noise grid.
+
+    Shards cover whole country blocks when there are enough of them;
+    otherwise each country block is further split into period ranges.
+    Alignment means no shard redraws noise cells owned by another.
+    """
+    n_countries, n_periods = plan['n_countries'], plan['n_periods']
+    cb, pb = plan['country_block'], plan['period_block']
+    groups = [(c0, min(c0 + cb, n_countries)) for c0 in range(0, n_countries, cb)]
+
+    if len(groups) >= n_shards:
+        for run in np.array_split(np.arange(len(groups)), n_shards):
+            yield groups[run[0]][0], groups[run[-1]][1], 0, n_periods
+        return
+
+    period_blocks = -(-n_periods // pb)
+    splits = min(period_blocks, -(-n_shards // len(groups)))
+    for c0, c1 in groups:
+        for run in np.array_split(np.arange(period_blocks), splits):
+            yield c0, c1, run[0] * pb, min((run[-1] + 1) * pb, n_periods)
+
+
+def _generate_shard(plan, bounds, output_dir=None, shard=0, partition_by_year=False):
+    """Process pool task: generate one shard, optionally writing it to disk."""
+    df = _generate_chunk(plan, *bounds)
+    if output_dir is None:
+        return df
+    write_dataset(
+        df,
+        output_dir,
+        partition_by_year=partition_by_year,
+        basename_template=f"shard-{plan['first_period']:06d}-{shard:05d}-{{i}}.parquet",
+        existing_data_behavior='overwrite_or_ignore',
+    )
+    return len(df)
+
+
+def _merge_shards(plan, shards):
+    """Concatenate shard frames back into country/period/brand row order.
+
+    Shards that split a country block by period are interleaved country by
+    country so the result equals serial generation.
+    """
+    slots_per_country = plan['table']['valid'].sum(axis=1)
+    pieces = []
+    i = 0
+    while i < len(shards):
+        c0, c1 = shards[i][0][:2]
+        parts = []
+        while i < len(shards) and shards[i][0][:2] == (c0, c1):
+            parts.append(shards[i])
+            i += 1
+        if len(parts) == 1:
+            pieces.append(parts[0][1])
+            continue
+        offsets = []
+        for (_, _, p0, p1), df in parts:
+            counts = slots_per_country[c0:c1] * (p1 - p0)
+            offsets.append(np.concatenate([[0], np.cumsum(counts)]))
+        for c in range(c1 - c0):
+            for ((_, _, _, _), df), off in zip(parts, offsets):
+                pieces.append(df.iloc[off[c]:off[c + 1]])
+    return pd.concat(pieces, ignore_index=True)
+
+
+def generate_sample_data_parallel(workers=None, output_dir=None, rng=None, periods=13, freq='monthly',
+                                  start_date=None, country_multiplier=1, partition_by_year=False,
+                                  first_period=0, append=False):
+    """Generate sample data across a process pool.
+
+    The dataset is sharded by country block (and by period range when there
+    are fewer country blocks than shards). Every noise cell has its own
+    SeedSequence-spawned stream, so the output is identical to
+    ``generate_sample_data`` for the same seed, whatever the worker count.
+
+    Args:
+        workers: Number of worker processes. Defaults to the CPU count.
+        output_dir: If given, shards are written straight into a columnar
+            dataset there (see ``data_store``), replacing any existing
+            partitions, and the number of rows written is returned instead
+            of a DataFrame.
+        partition_by_year: Partition the written dataset by Year as well.
+        append: Add the shards to the partitions already in ``output_dir``
+            instead of replacing them (use with ``first_period``).
+        Other parameters are the same as for ``generate_sample_data``.
+    """
+    workers = workers or os.cpu_count() or 1
+    plan = _build_plan(periods, freq, start_date, country_multiplier, rng, first_period)
+
+    # Over-partition so uneven shards balance out, and keep shards bounded in size
+    n_slots = plan['table']['share'].shape[1]
+    total_rows = plan['n_countries'] * plan['n_periods'] * n_slots
+    n_shards = max(workers * 4, -(-total_rows // CHUNK_ROWS))
+    bounds = list(_shard_ranges(plan, n_shards))
+
+    if output_dir is not None and not append:
+        # Shards only add files, so clear out partitions from earlier runs first
+        output_dir = Path(output_dir)
+        for partition in output_dir.glob('Country=*'):
+            shutil.rmtree(partition)
+
+    tasks = (
+        [plan] * len(bounds),
+        bounds,
+        [output_dir] * len(bounds),
+        range(len(bounds)),
+        [partition_by_year] * len(bounds),
+    )
+    if workers == 1:
+        results = list(map(_generate_shard, *tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_generate_shard, *tasks))
+
+    if output_dir is not None:
+        return sum(results)
+    return _merge_shards(plan, list(zip(bounds, results)))
+
+
+def generate_sample_data(rng=None, verbose=True, periods=13, freq='monthly', start_date=None,
+                         country_multiplier=1, first_period=0):
+    """Generate sample mobile phone market data and return as DataFrame.
+
+    Args:
+        rng: Seed, ``SeedSequence`` or ``numpy.random.Generator`` for
+            reproducible runs. Defaults to fresh OS entropy.
+        verbose: Print a brief summary and preview of the data.
+        periods: Number of data points per country (13 monthly points
+            covers the past year).
+        freq: Spacing of data points: 'daily', 'weekly' or 'monthly'.
+        start_date: Date of the first data point. Defaults to one year ago.
+        country_multiplier: Repeat every country profile this many times as
+            synthetic countries, to scale the dataset up.
+        first_period: Index of the first period to generate, counted from
+            ``start_date``; used to generate periods that follow an
+            existing dataset (see ``generate_next_periods``).
+    """
+    plan = _build_plan(periods, freq, start_date, country_multiplier, rng, first_period)
 
     # Create DataFrame in memory and return it
-    df = pd.DataFrame(data_records)
+    df = pd.concat(_iter_chunks(plan), ignore_index=True)
 
-    # Optional: print a brief summary/preview, still all in memory
-    print("✅ Sample data generated in memory.")
-    print(f"📊 Records: {len(df)}")
-    print(f"🌍 Countries: {df['Country'].nunique()}")
-    print(f"📱 Brands: {df['Brand'].nunique()}")
-    print(f"🔧 Operating Systems: {df['OS'].nunique()}")
-    print("\nData Preview:")
-    print(df.head(10))
+    if verbose:
+        # Optional: print a brief summary/preview, still all in memory
+        print("✅ Sample data generated in memory.")
+        print(f"📊 Records: {len(df)}")
+        print(f"🌍 Countries: {df['Country'].nunique()}")
+        print(f"📱 Brands: {df['Brand'].nunique()}")
+        print(f"🔧 Operating Systems: {df['OS'].nunique()}")
+        print("\nData Preview:")
+        print(df.head(10))
 
     return df
 
 
+def generate_next_periods(data, rng=None, periods=1, freq='monthly', country_multiplier=None, countries=None):
+    """Generate the periods that follow an existing generated dataset.
+
+    The first date of ``data`` is taken as the start date and the number of
+    periods it already spans as the first new period, so dates and user
+    growth carry on where ``data`` ends. Pass the seed ``data`` was
+    generated with to continue the same series: the new periods equal the
+    ones a longer run with that seed would have generated.
+
+    Args:
+        data: DataFrame produced by ``generate_sample_data``.
+        country_multiplier: Defaults to the multiplier implied by the number
+            of countries in ``data``.
+        countries: Only return rows for these countries. Defaults to the
+            countries in ``data``.
+        Other parameters are the same as for ``generate_sample_data``.
+    """
+    dates = data['Date']
+    start, end = dates.min(), dates.max()
+    first_period = round((end - start).days / FREQUENCIES[freq]) + 1
+    if country_multiplier is None:
+        country_multiplier = max(1, -(-data['Country'].nunique() // len(COUNTRIES)))
+
+    df = generate_sample_data(rng=rng, verbose=False, periods=periods, freq=freq, start_date=start,
+                              country_multiplier=country_multiplier, first_period=first_period)
+    if countries is None:
+        countries = data['Country'].unique()
+    keep = df['Country'].isin(countries)
+    return df if keep.all() else df[keep].reset_index(drop=True)
+
+
+def iter_sample_data(batch_rows=100_000, rng=None, periods=13, freq='monthly', start_date=None,
+                     country_multiplier=1, as_arrow=False, first_period=0):
+    """Yield sample data as fixed-size batches, country by country and period by period.
+
+    Only about one batch is held in memory at a time, so the dataset can be
+    far larger than RAM. Every batch has ``batch_rows`` rows except possibly
+    the last. Parameters are the same as for ``generate_sample_data``; the
+    concatenated batches equal its output for the same seed.
+
+    Args:
+        batch_rows: Number of rows per batch.
+        as_arrow: Yield ``pyarrow.RecordBatch`` objects instead of DataFrames.
+    """
+    if batch_rows < 1:
+        raise ValueError("batch_rows must be at least 1")
+
+    if as_arrow:
+        import pyarrow as pa
+
+    def emit(batch):
+        batch = batch.reset_index(drop=True)
+        if as_arrow:
+            return pa.Table.from_pandas(batch, preserve_index=False).combine_chunks().to_batches()[0]
+        return batch
+
+    plan = _build_plan(periods, freq, start_date, country_multiplier, rng, first_period)
+    pending = None
+    for chunk in _iter_chunks(plan, batch_rows):
+        pending = chunk if pending is None else pd.concat([pending, chunk], ignore_index=True)
+        while len(pending) >= batch_rows:
+            yield emit(pending.iloc[:batch_rows])
+            pending = pending.iloc[batch_rows:]
+
+    if pending is not None and len(pending):
+        yield emit(pending)
+
+
+def write_sample_data_csv(path, rng=None, periods=13, freq='monthly', start_date=None,
+                          country_multiplier=1, chunk_rows=CHUNK_ROWS, first_period=0, append=False):
+    """Generate sample data batch by batch straight into a CSV file.
+
+    Only one batch is held in memory at a time, so the output can be much
+    larger than RAM. With ``append`` the rows are added to the end of an
+    existing file. Returns the number of rows written.
+    """
+    batches = iter_sample_data(chunk_rows, rng, periods, freq, start_date, country_multiplier,
+                               first_period=first_period)
+    rows = 0
+    for i, batch in enumerate(batches):
+        new_file = i == 0 and not append
+        batch.to_csv(path, mode='w' if new_file else 'a', header=new_file, index=False)
+        rows += len(batch)
+    return rows
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Generate sample mobile phone market data.")
+    parser.add_argument('--periods', type=int, default=13, help="Data points per country")
+    parser.add_argument('--freq', choices=list(FREQUENCIES), default='monthly', help="Spacing of data points")
+    parser.add_argument('--start-date', help="Date of the first data point (YYYY-MM-DD)")
+    parser.add_argument('--country-multiplier', type=int, default=1, help="Synthetic copies of each country")
+    parser.add_argument('--seed', type=int, help="Random seed for reproducible output")
+    parser.add_argument('--output', help="Write the data to this CSV (or .arrow IPC) file chunk by chunk")
+    parser.add_argument('--output-dir', help="Generate in parallel into a partitioned Parquet dataset here")
+    parser.add_argument('--partition-by-year', action='store_true', help="Partition --output-dir by Year too")
+    parser.add_argument('--workers', type=int, help="Worker processes for --output-dir (default: CPU count)")
+    parser.add_argument('--first-period', type=int, default=0,
+                        help="Skip this many periods after --start-date (to generate later periods)")
+    parser.add_argument('--append', action='store_true',
+                        help="Add the rows to an existing --output CSV or --output-dir dataset")
+    args = parser.parse_args()
+
+    options = dict(
+        rng=args.seed,
+        periods=args.periods,
+        freq=args.freq,
+        start_date=args.start_date,
+        country_multiplier=args.country_multiplier,
+        first_period=args.first_period,
+    )
+    if args.output_dir:
+        rows = generate_sample_data_parallel(
+            workers=args.workers,
+            output_dir=args.output_dir,
+            partition_by_year=args.partition_by_year,
+            append=args.append,
+            **options,
+        )
+        print(f"✅ {'Appended' if args.append else 'Wrote'} {rows} records to dataset {args.output_dir}")
+    elif args.output and Path(args.output).suffix in ('.arrow', '.feather', '.ipc'):
+        if args.append:
+            parser.error("Arrow IPC files cannot be appended to; use --output-dir or a CSV file")
+        write_ipc(iter_sample_data(CHUNK_ROWS, **options), args.output)
+        print(f"✅ Wrote Arrow IPC file {args.output}")
+    elif args.output:
+        rows = write_sample_data_csv(args.output, append=args.append, **options)
+        print(f"✅ {'Appended' if args.append else 'Wrote'} {rows} records to {args.output}")
+    else:
+        generate_sample_data(**options)
+
+
 if __name__ == "__main__":
-    df = generate_sample_data()
+    main()
@@ -0,0 +1,278 @@
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import weakref
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+"""
+Rerun Instrumentation
+
+Opt-in timing of each stage of a dashboard rerun, to find hot spots in
+production without attaching a profiler. Enable it for every session with
+the ``DASHBOARD_PROFILE`` environment variable, or for one browser session
+with the ``?profile=`` query parameter:
+
+- ``time``: wall and CPU time per stage (negligible overhead)
+- ``memory``: also the peak of new allocations per stage, with
+  ``tracemalloc`` (slows the rerun down noticeably while it runs)
+
+The script marks where each stage starts (``mark``) and wraps work that
+only runs on a cache miss (``stage``, ``timed``), so a stage that did not
+run does not appear. The dashboard shows the result in a sidebar panel.
+Each rerun can also be exported:
+
+- ``DASHBOARD_PROFILE_LOG``: append one JSON line per rerun to this file
+  (``-`` for stderr)
+- ``DASHBOARD_PROFILE_PROM``: keep per-stage totals for this process in
+  this file in the Prometheus text format (e.g. for the node_exporter
+  textfile collector)
+
+tracemalloc is process-wide, so memory peaks of reruns that overlap in
+other sessions include each other's allocations.
+"""
+
+MODES = {
+    "1": "time", "true": "time", "on": "time", "time": "time", "memory": "memory",
+    "0": None, "false": None, "off": None,
+}
+
+_lock = threading.Lock()
+_memory_users = 0
+_memory_started = False
+# Per-stage totals in this process: count, seconds, cpu_seconds, peak_bytes (max)
+_totals = {}
+
+
+def profile_mode(query_value=None):
+    """Return the profiling mode (None, "time" or "memory").
+
+    The query parameter wins over the ``DASHBOARD_PROFILE`` environment
+    variable, so one session can turn profiling on or off.
+    """
+    for value in (query_value, os.environ.get("DASHBOARD_PROFILE")):
+        if value is not None and str(value).strip().lower() in MODES:
+            return MODES[str(value).strip().lower()]
+    return None
+
+
+def _acquire_memory():
+    global _memory_users, _memory_started
+    with _lock:
+        if _memory_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _memory_started = True
+        _memory_users += 1
+
+
+def _release_memory():
+    global _memory_users, _memory_started
+    with _lock:
+        _memory_users -= 1
+        # Only stop tracing that was started here (not e.g. PYTHONTRACEMALLOC)
+        if _memory_users == 0 and _memory_started:
+            tracemalloc.stop()
+            _memory_started = False
+
+
+def _add_totals(name, seconds, cpu_seconds, peak_bytes=None):
+    with _lock:
+        totals = _totals.setdefault(name, {"count": 0, "seconds": 0.0, "cpu_seconds": 0.0, "peak_bytes": 0})
+        totals["count"] += 1
+        totals["seconds"] += seconds
+        totals["cpu_seconds"] += cpu_seconds
+        if peak_bytes is not None:
+            totals["peak_bytes"] = max(totals["peak_bytes"], peak_bytes)
+
+
+def _export(event):
+    log_path = os.environ.get("DASHBOARD_PROFILE_LOG")
+    if log_path:
+        line = json.dumps(event, default=str)
+        if log_path == "-":
+            print(line, file=sys.stderr)
+        else:
+            with _lock, open(log_path, "a") as log:
+                log.write(line + "\n")
+
+    prometheus_path = os.environ.get("DASHBOARD_PROFILE_PROM")
+    if prometheus_path:
+        # Write next to the target and rename, so scrapers never read a partial file
+        path = Path(prometheus_path)
+        temporary = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        temporary.write_text(prometheus_text())
+        os.replace(temporary, path)
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text():
+    """Per-stage totals of this process in the Prometheus text format."""
+    with _lock:
+        totals = {name: dict(values) for name, values in _totals.items()}
+    metrics = [
+        ("dashboard_stage_seconds_total", "counter", "Wall time spent in each dashboard stage.", "seconds"),
+        ("dashboard_stage_cpu_seconds_total", "counter", "CPU time of the rerun thread in each stage.", "cpu_seconds"),
+        ("dashboard_stage_runs_total", "counter", "Number of times each stage ran.", "count"),
+        ("dashboard_stage_peak_bytes", "gauge", "Largest peak of new allocations in each stage.", "peak_bytes"),
+    ]
+    lines = []
+    for metric, kind, help_text, field in metrics:
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for name, values in sorted(totals.items()):
+            lines.append(f'{metric}{{stage="{_label(name)}"}} {values[field]}')
+    return "\n".join(lines) + "\n"
+
+
+class RerunProfile:
+    """Stage timings (and allocation peaks) of one dashboard rerun.
+
+    Args:
+        mode: None (disabled: every method is a no-op), "time" or "memory".
+        start: ``time.perf_counter()`` value the rerun started at; the
+            total covers the time from there to ``finish``.
+    """
+
+    def __init__(self, mode=None, start=None):
+        self.mode = mode
+        self.enabled = mode is not None
+        self.memory = mode == "memory"
+        self.start = time.perf_counter() if start is None else start
+        self.records = []
+        self.total_seconds = None
+        self.finished = False
+        self._stack = []
+        self._thread = threading.get_ident()
+        self._release = None
+        if self.memory:
+            _acquire_memory()
+            # Also released if the rerun ends early (e.g. st.rerun) and never finishes
+            self._release = weakref.finalize(self, _release_memory)
+
+    def _active(self):
+        return self.enabled and not self.finished and threading.get_ident() == self._thread
+
+    def _open(self, name):
+        record = {"stage": name, "depth": len(self._stack)}
+        frame = {"record": record, "start": time.perf_counter(), "cpu": time.thread_time()}
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                self._stack[-1]["peak"] = max(self._stack[-1]["peak"], peak)
+            tracemalloc.reset_peak()
+            frame["base"] = frame["peak"] = current
+        self.records.append(record)
+        self._stack.append(frame)
+
+    def _close(self):
+        frame = self._stack.pop()
+        record = frame["record"]
+        record["seconds"] = time.perf_counter() - frame["start"]
+        record["cpu_seconds"] = time.thread_time() - frame["cpu"]
+        if self.memory:
+            peak = max(frame["peak"], tracemalloc.get_traced_memory()[1])
+            record["peak_bytes"] = peak - frame["base"]
+            if self._stack:
+                self._stack[-1]["peak"] = max(self._stack[-1]["peak"], peak)
+
+    def mark(self, name):
+        """End the current top-level stage and start the next one."""
+        if not self._active():
+            return
+        while self._stack:
+            self._close()
+        self._open(name)
+
+    @contextmanager
+    def stage(self, name):
+        """Time a block as a stage nested in the current one."""
+        if not self._active():
+            yield
+            return
+        self._open(name)
+        try:
+            yield
+        finally:
+            self._close()
+
+    def timed(self, name, function):
+        """Wrap ``function`` so each call is timed as a stage.
+
+        Calls made after the rerun (e.g. a download generated when its
+        button is clicked) are exported on their own.
+        """
+        if not self.enabled:
+            return function
+
+        def call(*args, **kwargs):
+            if self._active():
+                with self.stage(name):
+                    return function(*args, **kwargs)
+            start, cpu = time.perf_counter(), time.thread_time()
+            result = function(*args, **kwargs)
+            seconds, cpu_seconds = time.perf_counter() - start, time.thread_time() - cpu
+            _add_totals(name, seconds, cpu_seconds)
+            _export({
+                "event": "dashboard_stage",
+                "time": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+                "stage": name,
+                "seconds": seconds,
+                "cpu_seconds": cpu_seconds,
+            })
+            return result
+
+        return call
+
+    def finish(self, **context):
+        """End the rerun: close open stages, add to the process totals and export.
+
+        ``context`` (e.g. country, tab) is included in the exported event.
+        """
+        if not self._active():
+            return self
+        while self._stack:
+            self._close()
+        self.total_seconds = time.perf_counter() - self.start
+        self.finished = True
+        if self._release is not None:
+            self._release()
+
+        for record in self.records:
+            _add_totals(record["stage"], record["seconds"], record["cpu_seconds"], record.get("peak_bytes"))
+        _add_totals("rerun", self.total_seconds, sum(r["cpu_seconds"] for r in self.records if r["depth"] == 0))
+        _export(self.to_json(**context))
+        return self
+
+    def to_json(self, **context):
+        """The rerun as a JSON-serializable event."""
+        return {
+            "event": "dashboard_rerun",
+            "time": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "mode": self.mode,
+            "total_seconds": self.total_seconds,
+            **context,
+            "stages": self.records,
+        }
+
+    def table(self):
+        """One row per stage for display; nested stages are indented."""
+        total = self.total_seconds or sum(r["seconds"] for r in self.records if r["depth"] == 0) or 1.0
+        rows = []
+        for record in self.records:
+            row = {
+                "Stage": "\u2003" * record["depth"] + ("↳ " if record["depth"] else "") + record["stage"],
+                "ms": round(record["seconds"] * 1000, 1),
+                "CPU ms": round(record["cpu_seconds"] * 1000, 1),
+                "% of rerun": round(100 * record["seconds"] / total, 1),
+            }
+            if "peak_bytes" in record:
+                row["Peak MB"] = round(record["peak_bytes"] / 2**20, 2)
+            rows.append(row)
+        return rows
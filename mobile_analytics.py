@@ -1,26 +1,48 @@
+import time
+
+SCRIPT_START = time.perf_counter()
+
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from PIL import Image
-import base64
+import inspect
+import json
 from pathlib import Path
-from generate_sample_data import generate_sample_data  
+from generate_sample_data import generate_next_periods
+from data_store import latest_date as read_latest_date, list_countries, partition_version, read_country, read_countries
+from dataset_cache import dataset_cache
+from figure_cache import cached_figure, figure_cache
+from aggregates import RENAME_MAP, TAB_COLUMNS, build_comparison, build_cubes, select_comparison, update_cubes
+from country_index import CountryIndex
+from excel_ingest import cached_sheet
+from downsample import TREND_MAX_POINTS, downsample_lines
+import charts
+from table_view import export_csv, export_parquet, page_rows
+from instrumentation import RerunProfile, profile_mode, prometheus_text
+from time_ranges import GENERATION_RANGES, RANGE_DAYS, RANGE_LABELS, filter_range, generate_range_data
+from startup import FAVICON_SIZE, LOGO_SIZE, PROCESS_TIMINGS, image_data_url, record_timing
+
+# Only the first run in a process actually imports anything
+record_timing("imports", time.perf_counter() - SCRIPT_START)
+
+LOGO_PATH = Path(__file__).with_name("mobieAppLogo.png")
 
 if "run_button_success" not in st.session_state:
     st.session_state.run_button_success = False
 
 
-icon = Image.open("mobieAppLogo.png")  # or .ico, .jpg, etc.
-
-# Page configuration
+# Page configuration. The icon is a small data: URL built once per process
+# (see startup.py), which Streamlit passes through without re-encoding.
 st.set_page_config(
     page_title="Mobile Market Analytics",
-    page_icon=icon, #"📱",
+    page_icon=image_data_url(LOGO_PATH, FAVICON_SIZE), #"📱",
     layout="wide",
     initial_sidebar_state="expanded",
 )
 
+# Opt-in per-stage timing of this rerun (see instrumentation.py)
+profile = RerunProfile(profile_mode(st.query_params.get("profile")), start=SCRIPT_START)
+profile.mark("page setup")
+
 # Custom CSS for better styling
 st.markdown(
     """
@@ -56,29 +78,55 @@ def custom_metric(col, label, value, font_size=20):
 
 
 
-def img_to_base64(img_path: str) -> str:
-    img_bytes = Path(img_path).read_bytes()
-    return base64.b64encode(img_bytes).decode()
-
-img_base64 = img_to_base64("mobieAppLogo.png")  # your local file
-
+# The logo is scaled down and encoded once per process, so each rerun sends
+# a few kilobytes instead of the full-size PNG
 st.markdown(
     f"""
     <div style="display:flex; align-items:center; gap:10px;">
-        <img src="data:image/png;base64,{img_base64}" width="110">
+        <img src="{image_data_url(LOGO_PATH, LOGO_SIZE)}" width="110">
         <div class="title-style">Mobile Phone Market Analytics</div>
     </div>
     """,
     unsafe_allow_html=True,
 )
 
+# Time to the first visible content: once per process (cold start) and per session
+paint_seconds = time.perf_counter() - SCRIPT_START
+record_timing("first paint", paint_seconds)
+st.session_state.setdefault("first_paint_seconds", paint_seconds)
+
 st.markdown("---")
 
 # -----------------------------
 # Sidebar configuration
 # -----------------------------
+profile.mark("sidebar")
 st.sidebar.header("⚙️ Configuration")
 
+st.sidebar.subheader("📂 Data Source", help="Generate sample data in memory or open a columnar dataset.")
+data_source = st.sidebar.radio(
+    "Data source",
+    ["Generate sample data", "Columnar dataset"],
+    label_visibility="collapsed",
+)
+dataset_path = None
+if data_source == "Columnar dataset":
+    dataset_path = st.sidebar.text_input(
+        "Dataset directory",
+        value="mobile_data_store",
+        help="Parquet dataset directory partitioned by Country, a memory-mapped .arrow file (see data_store.py) "
+             "or an Excel workbook, which is converted to a cached .arrow file once (see excel_ingest.py).",
+    )
+    if Path(dataset_path).suffix.lower() in (".xlsx", ".xlsm") and Path(dataset_path).is_file():
+        # Converted once; later runs map the cached copy while the workbook is unchanged
+        with st.spinner("Converting workbook to a columnar cache..."):
+            cached = cached_sheet(dataset_path, ingest=True)
+        if cached is not None:
+            dataset_path = str(cached)
+        else:
+            st.sidebar.error(f"No data found in workbook '{dataset_path}'.")
+            dataset_path = None
+
 st.sidebar.subheader("📚 Sources", help="Check the sources to query.")
 source_google_play = st.sidebar.checkbox("Google Play", value=True)
 source_app_store = st.sidebar.checkbox("App Store", value=True)
@@ -87,29 +135,130 @@ source_other = st.sidebar.checkbox("Other", value=False)
 st.sidebar.subheader("⚙️ Settings", help="Add additional info.")
 api_key = st.sidebar.text_input("key")
 instructions_text = st.sidebar.text_area("Instructions", height=120)
+seed = st.sidebar.number_input(
+    "Seed",
+    min_value=0,
+    value=42,
+    step=1,
+    help="The same seed and options give the same data, shared by all sessions.",
+)
 
 st.sidebar.subheader("⏱️ Time Range", help="Select the time range for query.")
 time_range = st.sidebar.selectbox(
     "Select time range",
-    ["Last 7 days", "Last 30 days", "Last year", "Last 5 years"], index=2,
+    list(RANGE_LABELS.values()), index=2,
 )
 
 #st.sidebar.subheader("▶️ Run")
 #run_generation = st.sidebar.button("Run",)
 
-# Map timerange to something generate_sample_data could use in future (kept for UI only)
-range_map = {
-    "Last 7 days": "7d",
-    "Last 30 days": "30d",
-    "Last year": "1y",
-    "Last 5 years": "5y",
-}
+# The time range is a query parameter: generated data covers exactly the range
+# (a bounded number of periods ending today), and datasets are read only from
+# the range ending at the selected country's latest date (see time_ranges.py).
+range_map = {label: code for code, label in RANGE_LABELS.items()}
 selected_range_code = range_map.get(time_range, "1y")
 
 # -----------------------------
-# Data loading: in-memory only
+# Data loading: in-memory or columnar dataset
 # -----------------------------
 data = None
+data_key = None
+countries = None
+selected_country = None
+
+# Generated data lives in the process-wide cache, shared by all sessions;
+# each session only keeps the key of the data it is looking at.
+generation_key = (
+    "generated",
+    selected_range_code,
+    int(seed),
+    (source_google_play, source_app_store, source_other),
+)
+
+
+def load_generated_data(key):
+    """Fetch generated data from the shared cache, generating it on a miss.
+
+    The rows are cached only inside their country index, which counts them
+    against the cache bound (see CountryIndex.nbytes).
+    """
+    return load_country_index(key).frame
+
+
+# Lazy tabs: recent Streamlit versions track the selected tab when st.tabs
+# gets on_change="rerun", so only its content runs. Older versions run every tab.
+LAZY_TABS = "on_change" in inspect.signature(st.tabs).parameters
+
+
+def tab_open(tab):
+    """Whether a tab's content should run on this rerun."""
+    return getattr(tab, "open", True) is not False
+
+
+# Raw Data tab page sizes; the table only ever receives one page
+PAGE_SIZES = [20, 50, 100, 500]
+
+
+def trend_view(cubes_key, country, cubes, name, by):
+    """Return a trend cube downsampled for plotting (see downsample.py).
+
+    Long histories are reduced to about ``TREND_MAX_POINTS`` points per
+    line, once per dataset and country, through the shared cache.
+    """
+    trend = cubes.get(name)
+    if trend is None or len(trend) <= TREND_MAX_POINTS:
+        return trend
+    return dataset_cache.get_or_create(
+        ("trend_view", cubes_key, country, name, TREND_MAX_POINTS),
+        profile.timed("downsample", lambda: downsample_lines(trend, "Date", "MarketShare", by, TREND_MAX_POINTS)),
+    )
+
+
+# Periods appended to generated data get their own keys. Each one is built
+# from the previous key's index and cubes plus the new rows, so an append
+# never regenerates, re-sorts or re-aggregates the rows that were already there.
+def appended_key(base_key, periods):
+    """Key of generated data with ``periods`` extra periods (the base key for 0)."""
+    return base_key if periods == 0 else ("appended", base_key, periods)
+
+
+def load_appended_rows(key):
+    """Rows added by the last period of an appended key."""
+    _, base_key, periods = key
+    previous = appended_key(base_key, periods - 1)
+    return dataset_cache.get_or_create(
+        ("appended_rows", key),
+        lambda: generate_next_periods(
+            load_country_index(previous).frame,
+            rng=base_key[2],
+            freq=GENERATION_RANGES[base_key[1]][0],
+        ),
+    )
+
+
+def load_country_index(key):
+    """Row offsets per country, built once per dataset and shared by all sessions."""
+    if key[0] == "appended":
+        _, base_key, periods = key
+        previous = appended_key(base_key, periods - 1)
+        return dataset_cache.get_or_create(
+            ("index", key), lambda: load_country_index(previous).append(load_appended_rows(key))
+        )
+    return dataset_cache.get_or_create(
+        ("index", key), lambda: CountryIndex(generate_range_data(key[1], seed=key[2], verbose=True))
+    )
+
+
+def load_cubes(key):
+    """Rollups for every country of generated data; appends only update affected countries."""
+    if key[0] == "appended":
+        _, base_key, periods = key
+        previous = appended_key(base_key, periods - 1)
+        return dataset_cache.get_or_create(
+            ("cubes", key),
+            lambda: update_cubes(load_cubes(previous), load_appended_rows(key), load_country_index(key).get),
+        )
+    return dataset_cache.get_or_create(("cubes", key), lambda: build_cubes(load_generated_data(key)))
 
 
 
@@ -119,6 +268,13 @@ col1, col2 = st.sidebar.columns([3, 1])
 with col1:
     run_generation = st.button("Run", use_container_width=True)
 
+append_period = False
+if dataset_path is None and "generated_key" in st.session_state:
+    append_period = st.sidebar.button(
+        "➕ Append next period",
+        help="Add one more period of data; only the new rows are generated and aggregated.",
+    )
+
 # Apply button color based on success state
 if st.session_state.run_button_success:
     st.markdown("""
@@ -146,10 +302,13 @@ else:
 #     except Exception as e:
 #         st.sidebar.error(f"Error generating in-memory data: {e}")
 
-if run_generation:
+profile.mark("load data")
+if run_generation and dataset_path is None:
     try:
-        data = generate_sample_data()
-        st.session_state["generated_data"] = data
+        data = load_generated_data(generation_key)
+        data_key = generation_key
+        st.session_state["generated_key"] = generation_key
+        st.session_state["appended_periods"] = 0
         st.session_state.run_button_success = True  # ✅ Now safe to set
         st.sidebar.success("Data generated in memory and loaded into the app.")
         st.rerun()  # Rerun to apply green color
@@ -158,14 +317,51 @@ if run_generation:
         st.session_state.run_button_success = False
 
 
-# If user already generated data earlier this session, reuse it.
-if data is None and "generated_data" in st.session_state:
-    data = st.session_state["generated_data"]
+if append_period and data is None:
+    st.session_state["appended_periods"] = st.session_state.get("appended_periods", 0) + 1
 
-if data is not None:
+# If user already generated data earlier this session, reuse it.
+if dataset_path is None and data is None and "generated_key" in st.session_state:
+    data_key = appended_key(st.session_state["generated_key"], st.session_state.get("appended_periods", 0))
+    data = load_generated_data(data_key)
+
+if dataset_path is not None:
+    if Path(dataset_path).exists() and list_countries(dataset_path):
+        # Only the country listing is read here; country data is loaded on selection
+        countries = list_countries(dataset_path)
+        st.sidebar.success("Dataset opened successfully!")
+        st.sidebar.info(f"Countries: {len(countries)}")
+    else:
+        st.sidebar.error(f"No dataset found at '{dataset_path}'.")
+elif data is not None:
     st.sidebar.success("Data loaded successfully!")
     st.sidebar.info(f"Records: {len(data)} | Columns: {len(data.columns)}")
-else:
+    if "Country" in data.columns:
+        with profile.stage("country index"):
+            country_index = load_country_index(data_key)
+        countries = country_index.countries
+
+profile.mark("status panels")
+with st.sidebar.expander("🗄️ Dataset cache"):
+    for cache_name, cache in [("Data", dataset_cache), ("Figures", figure_cache)]:
+        cache_stats = cache.stats()
+        st.markdown(
+            f"**{cache_name}**  \n"
+            f"**Entries:** {cache_stats['entries']}  \n"
+            f"**Memory:** {cache_stats['bytes'] / 2**20:.1f} / {cache_stats['max_bytes'] / 2**20:.0f} MB  \n"
+            f"**Hit rate:** {cache_stats['hit_rate']:.0%} "
+            f"({cache_stats['hits']} hits, {cache_stats['misses']} misses)  \n"
+            f"**Evictions:** {cache_stats['evictions']} | **Expired:** {cache_stats['expirations']}"
+        )
+
+with st.sidebar.expander("🚀 Startup"):
+    st.markdown(
+        "  \n".join(f"**{name}:** {seconds * 1000:.0f} ms" for name, seconds in PROCESS_TIMINGS.items())
+        + f"  \n**First paint (this session):** {st.session_state.first_paint_seconds * 1000:.0f} ms"
+        + f"  \n**Header paint (this rerun):** {paint_seconds * 1000:.0f} ms"
+    )
+
+if data is None and countries is None:
     st.info(
         "How to Use This Dashboard\n\n"
         "1. Configure options in the sidebar and press **Run**.\n"
@@ -176,33 +372,58 @@ else:
 # -----------------------------
 # Main analytics UI
 # -----------------------------
-if data is not None:
-    if "Country" in data.columns:
-        countries = sorted(data["Country"].unique())
+if data is not None or countries is not None:
+    if countries is not None:
         selected_country = st.selectbox(
             "Select Country",
             countries,
             help="Choose a country to view mobile market data",
         )
 
-        country_data = data[data["Country"] == selected_country].copy()
+        profile.mark("rollups")
+        # Rollups for the tabs are built once per dataset and shared through the
+        # cache; generated data gets them for all countries in one pass. Dataset
+        # rollups are keyed by the country's partition, so appending rows to other
+        # countries (data_store.append_dataset) does not invalidate them.
+        if dataset_path is not None:
+            columns = list(dict.fromkeys(
+                ["Country"] + [c for tab, cols in TAB_COLUMNS.items() if tab != "raw" for c in cols]
+            ))
+            version = partition_version(dataset_path, selected_country)
+            latest = dataset_cache.get_or_create(
+                ("latest", dataset_path, version, selected_country),
+                lambda: read_latest_date(dataset_path, selected_country),
+            )
+            since = None if latest is None else latest - pd.Timedelta(days=RANGE_DAYS[selected_range_code] - 1)
+            cubes_key = ("cubes", dataset_path, version, selected_country, selected_range_code)
+            range_label = time_range
+
+            # Rows are only read to build the rollups or for the Raw Data tab
+            def load_country_data(columns=columns):
+                with profile.stage("read country data"):
+                    return read_country(dataset_path, selected_country, columns=columns, since=since)
 
-        if not country_data.empty:
+            all_cubes = dataset_cache.get_or_create(
+                cubes_key, profile.timed("build rollups", lambda: build_cubes(load_country_data()))
+            )
+        else:
+            cubes_key = ("cubes", data_key)
+            all_cubes = load_cubes(data_key)
+            # Generated data covers the range it was generated for, which differs
+            # from the sidebar selection until Run is pressed again
+            base_key = data_key if data_key[0] == "generated" else data_key[1]
+            range_label = RANGE_LABELS[base_key[1]]
+
+            def load_country_data(columns=None):
+                return country_index.get(selected_country)
+        cubes = all_cubes.get(selected_country, {})
+        metrics = cubes.get("metrics") or {}
+
+        if cubes:
+            profile.mark("metrics")
             st.subheader(f"Market Analysis - {selected_country}")
             st.markdown("---")
 
-            # Normalize column names from generator to names used below. [file:1]
-            rename_map = {
-                "Market_Share": "MarketShare",
-                "Users_Millions": "UsersMillions",
-                "Usage_Hours": "UsageHours",
-            }
-            country_data = country_data.rename(columns=rename_map)
-
-            # Ensure Date column is datetime
-            if "Date" in country_data.columns:
-                country_data["Date"] = pd.to_datetime(country_data["Date"], errors="coerce")
-
             # Top metrics
             col1, col2, col3, col4 = st.columns(4)
 
@@ -220,18 +441,18 @@ if data is not None:
             #     avg_usage = country_data["UsageHours"].mean()
             #     col4.metric("Average Daily Usage (hours)", f"{avg_usage:.2f}")
 
-            if "Date" in country_data.columns:
-                latest_date = country_data["Date"].max()
-                earliest_date = country_data["Date"].min()
+            if "start" in metrics:
+                latest_date = metrics["end"]
+                earliest_date = metrics["start"]
                 custom_metric(col1, "Start Date", str(earliest_date.date()) if pd.notnull(earliest_date) else "N/A", font_size=20)
                 custom_metric(col2, "End Data ", str(latest_date.date()) if pd.notnull(latest_date) else "N/A", font_size=20)
             
-            if "MarketShare" in country_data.columns:
-                avg_share = country_data["MarketShare"].mean()
+            if "avg_share" in metrics:
+                avg_share = metrics["avg_share"]
                 custom_metric(col3, "Average Market Share", f"{avg_share:.2f}", font_size=20)
             
-            if "UsageHours" in country_data.columns:
-                avg_usage = country_data["UsageHours"].mean()
+            if "avg_usage" in metrics:
+                avg_usage = metrics["avg_usage"]
                 custom_metric(col4, "Average Daily Usage (hours)", f"{avg_usage:.2f}", font_size=20)
             
             
@@ -241,246 +462,286 @@ if data is not None:
             st.markdown("---")
 
             # Tabs
-            tab1, tab2, tab3, tab4, tab5 = st.tabs(
-                ["📈 Trends", "🏢 Brand Distribution", "📱 OS Distribution", "📊 Usage Patterns", "📄 Raw Data"]
-            )
+            # Only the selected tab runs; the others run when they are opened
+            tab_labels = [
+                "📈 Trends", "🏢 Brand Distribution", "📱 OS Distribution", "📊 Usage Patterns", "📄 Raw Data",
+                "🌍 Compare Countries",
+            ]
+            if LAZY_TABS:
+                tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(tab_labels, key="active_tab", on_change="rerun")
+            else:
+                tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(tab_labels)
 
             # -----------------------------
             # Tab 1: Trends Over Time
             # -----------------------------
             with tab1:
-                st.subheader("Market Trends Over Time")
-
-                if "Date" in country_data.columns and "Brand" in country_data.columns:
-                    brand_trend = (
-                        country_data.groupby(["Date", "Brand"])["MarketShare"]
-                        .sum()
-                        .reset_index()
-                    )
-
-                    if not brand_trend.empty:
-                        fig = px.line(
-                            brand_trend,
-                            x="Date",
-                            y="MarketShare",
-                            color="Brand",
-                            title="Brand Market Share Trend (Past Year)",
-                            markers=True,
-                            labels={"MarketShare": "Market Share", "Date": "Date"},
-                        )
-                        fig.update_layout(height=500, hovermode="x unified")
-                        st.plotly_chart(fig, use_container_width=True)
-
-                if "Date" in country_data.columns and "OS" in country_data.columns:
-                    os_trend = (
-                        country_data.groupby(["Date", "OS"])["MarketShare"]
-                        .sum()
-                        .reset_index()
-                    )
+                if tab_open(tab1):
+                    profile.mark("tab: Trends")
+                    st.subheader("Market Trends Over Time")
+
+                    # Figures are built once per dataset, country and chart and
+                    # shared by all sessions (see figure_cache.py)
+                    brand_trend = trend_view(cubes_key, selected_country, cubes, "brand_trend", "Brand")
+                    if brand_trend is not None:
+                        if not brand_trend.empty:
+                            fig = cached_figure(
+                                cubes_key, selected_country, "brand_trend",
+                                profile.timed("figure: brand_trend", lambda: charts.brand_trend_figure(brand_trend, range_label)),
+                            )
+                            st.plotly_chart(fig, use_container_width=True)
 
-                    if not os_trend.empty:
-                        fig = px.line(
-                            os_trend,
-                            x="Date",
-                            y="MarketShare",
-                            color="OS",
-                            title="Operating System Market Share Trend (Past Year)",
-                            markers=True,
-                            labels={"MarketShare": "Market Share", "Date": "Date"},
+                    os_trend = trend_view(cubes_key, selected_country, cubes, "os_trend", "OS")
+                    if os_trend is not None:
+                        if not os_trend.empty:
+                            fig = cached_figure(
+                                cubes_key, selected_country, "os_trend",
+                                profile.timed("figure: os_trend", lambda: charts.os_trend_figure(os_trend, range_label)),
+                            )
+                            st.plotly_chart(fig, use_container_width=True)
+                    else:
+                        st.info(
+                            "No time series data available. Please ensure the data has Date and Brand columns."
                         )
-                        fig.update_layout(height=500, hovermode="x unified")
-                        st.plotly_chart(fig, use_container_width=True)
-                else:
-                    st.info(
-                        "No time series data available. Please ensure the data has Date and Brand columns."
-                    )
 
             # -----------------------------
             # Tab 2: Brand Distribution
             # -----------------------------
             with tab2:
-                st.subheader("Phone Brand Distribution")
-
-                if "Brand" in country_data.columns and "MarketShare" in country_data.columns:
-                    if "Date" in country_data.columns:
-                        latest_data = country_data[country_data["Date"] == country_data["Date"].max()]
-                    else:
-                        latest_data = country_data
-
-                    brand_data = (
-                        latest_data.groupby("Brand")["MarketShare"]
-                        .sum()
-                        .reset_index()
-                        .sort_values("MarketShare", ascending=False)
-                    )
-
-                    if not brand_data.empty:
-                        col1, col2 = st.columns(2)
-
-                        with col1:
-                            fig = px.pie(
-                                brand_data,
-                                values="MarketShare",
-                                names="Brand",
-                                title="Current Brand Market Share Distribution",
-                                hole=0.3,
-                            )
-                            fig.update_layout(height=500)
-                            st.plotly_chart(fig, use_container_width=True)
-
-                        with col2:
-                            st.dataframe(
-                                brand_data.rename(columns={"MarketShare": "Share"}),
-                                use_container_width=True,
-                                hide_index=True,
-                            )
+                if tab_open(tab2):
+                    profile.mark("tab: Brand Distribution")
+                    st.subheader("Phone Brand Distribution")
+
+                    brand_data = cubes.get("brand_share")
+                    if brand_data is not None:
+                        if not brand_data.empty:
+                            col1, col2 = st.columns(2)
+
+                            with col1:
+                                fig = cached_figure(
+                                    cubes_key, selected_country, "brand_share",
+                                    profile.timed("figure: brand_share", lambda: charts.brand_share_figure(brand_data)),
+                                )
+                                st.plotly_chart(fig, use_container_width=True)
+
+                            with col2:
+                                st.dataframe(
+                                    brand_data.rename(columns={"MarketShare": "Share"}),
+                                    use_container_width=True,
+                                    hide_index=True,
+                                )
+                        else:
+                            st.info("No brand data available.")
                     else:
-                        st.info("No brand data available.")
-                else:
-                    st.info("Please ensure the data has Brand and MarketShare columns.")
+                        st.info("Please ensure the data has Brand and MarketShare columns.")
 
             # -----------------------------
             # Tab 3: OS Distribution
             # -----------------------------
             with tab3:
-                st.subheader("Operating System Distribution")
-
-                if "OS" in country_data.columns and "MarketShare" in country_data.columns:
-                    if "Date" in country_data.columns:
-                        latest_data = country_data[country_data["Date"] == country_data["Date"].max()]
+                if tab_open(tab3):
+                    profile.mark("tab: OS Distribution")
+                    st.subheader("Operating System Distribution")
+
+                    os_data = cubes.get("os_share")
+                    if os_data is not None:
+                        if not os_data.empty:
+                            col1, col2 = st.columns(2)
+
+                            with col1:
+                                fig = cached_figure(
+                                    cubes_key, selected_country, "os_share",
+                                    profile.timed("figure: os_share", lambda: charts.os_share_figure(os_data)),
+                                )
+                                st.plotly_chart(fig, use_container_width=True)
+
+                            with col2:
+                                st.dataframe(
+                                    os_data.rename(columns={"MarketShare": "Share"}),
+                                    use_container_width=True,
+                                    hide_index=True,
+                                )
+                        else:
+                            st.info("No OS data available.")
                     else:
-                        latest_data = country_data
+                        st.info("Please ensure the data has OS and MarketShare columns.")
 
-                    os_data = (
-                        latest_data.groupby("OS")["MarketShare"]
-                        .sum()
-                        .reset_index()
-                        .sort_values("MarketShare", ascending=False)
-                    )
+            # -----------------------------
+            # Tab 4: Usage Patterns
+            # -----------------------------
+            with tab4:
+                if tab_open(tab4):
+                    profile.mark("tab: Usage Patterns")
+                    st.subheader("User Engagement & Usage Patterns")
 
-                    if not os_data.empty:
+                    brand_usage = cubes.get("brand_usage")
+                    brand_users = cubes.get("brand_users")
+                    if brand_usage is not None or brand_users is not None:
                         col1, col2 = st.columns(2)
 
+                        # Average usage hours by brand
                         with col1:
-                            fig = px.bar(
-                                os_data,
-                                x="OS",
-                                y="MarketShare",
-                                title="Current OS Market Share",
-                                labels={"MarketShare": "Market Share", "OS": "Operating System"},
-                                color="OS",
-                            )
-                            fig.update_layout(height=500, showlegend=False)
-                            st.plotly_chart(fig, use_container_width=True)
-
+                            if brand_usage is not None:
+                                fig = cached_figure(
+                                    cubes_key, selected_country, "brand_usage",
+                                    profile.timed("figure: brand_usage", lambda: charts.brand_usage_figure(brand_usage)),
+                                )
+                                st.plotly_chart(fig, use_container_width=True)
+
+                        # User base by brand
                         with col2:
-                            st.dataframe(
-                                os_data.rename(columns={"MarketShare": "Share"}),
-                                use_container_width=True,
-                                hide_index=True,
-                            )
+                            if brand_users is not None:
+                                fig = cached_figure(
+                                    cubes_key, selected_country, "brand_users",
+                                    profile.timed("figure: brand_users", lambda: charts.brand_users_figure(brand_users)),
+                                )
+                                st.plotly_chart(fig, use_container_width=True)
                     else:
-                        st.info("No OS data available.")
-                else:
-                    st.info("Please ensure the data has OS and MarketShare columns.")
+                        st.info(
+                            "Please ensure the data has UsageHours or UsersMillions columns for this analysis."
+                        )
 
             # -----------------------------
-            # Tab 4: Usage Patterns
+            # Tab 5: Raw Data
             # -----------------------------
-            with tab4:
-                st.subheader("User Engagement & Usage Patterns")
+            with tab5:
+                if tab_open(tab5):
+                    profile.mark("tab: Raw Data")
+                    st.subheader("Raw Data View")
 
-                if "UsageHours" in country_data.columns or "UsersMillions" in country_data.columns:
-                    col1, col2 = st.columns(2)
+                    # Normalize column names from generator to names used below. [file:1]
+                    # Dates are already datetime64 (see schema.py), so no re-parsing here
+                    with profile.stage("read raw rows"):
+                        country_data = load_country_data(TAB_COLUMNS["raw"]).rename(columns=RENAME_MAP)
 
-                    # Average usage hours by brand
+                    col1, col2, col3 = st.columns(3)
                     with col1:
-                        if "UsageHours" in country_data.columns:
-                            if "Date" in country_data.columns:
-                                latest_data = country_data[country_data["Date"] == country_data["Date"].max()]
-                            else:
-                                latest_data = country_data
-
-                            brand_usage = (
-                                latest_data.groupby("Brand")["UsageHours"]
-                                .mean()
-                                .reset_index()
-                                .sort_values("UsageHours", ascending=True)
-                            )
-
-                            fig = px.bar(
-                                brand_usage,
-                                x="UsageHours",
-                                y="Brand",
-                                title="Average Daily Usage by Brand (hours)",
-                                labels={"UsageHours": "Hours per Day", "Brand": "Brand"},
-                            )
-                            fig.update_layout(height=400)
-                            st.plotly_chart(fig, use_container_width=True)
-
-                    # User base by brand
+                        sort_by = st.selectbox(
+                            "Sort by",
+                            options=country_data.columns.tolist(),
+                            index=0
+                            if "Date" not in country_data.columns
+                            else list(country_data.columns).index("Date"),
+                        )
                     with col2:
-                        if "UsersMillions" in country_data.columns:
-                            if "Date" in country_data.columns:
-                                latest_data = country_data[country_data["Date"] == country_data["Date"].max()]
-                            else:
-                                latest_data = country_data
-
-                            brand_users = (
-                                latest_data.groupby("Brand")["UsersMillions"]
-                                .sum()
-                                .reset_index()
-                                .sort_values("UsersMillions", ascending=False)
-                                .head(10)
-                            )
-
-                            fig = px.bar(
-                                brand_users,
-                                x="Brand",
-                                y="UsersMillions",
-                                title="User Base by Brand (Millions)",
-                                labels={"UsersMillions": "Users (Millions)", "Brand": "Brand"},
-                                color="Brand",
-                            )
-                            fig.update_layout(height=400, showlegend=False)
-                            st.plotly_chart(fig, use_container_width=True)
-                else:
-                    st.info(
-                        "Please ensure the data has UsageHours or UsersMillions columns for this analysis."
+                        page_size = st.selectbox("Rows per page", options=PAGE_SIZES, index=0)
+                    with col3:
+                        page_count = max(1, -(-len(country_data) // page_size))
+                        page = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1)
+
+                    # Only the rows up to the end of the page are selected and sorted
+                    with profile.stage("page rows"):
+                        display_df = page_rows(country_data, sort_by, int(page) - 1, page_size)
+                    first_row = (int(page) - 1) * page_size
+                    st.caption(
+                        f"Rows {min(first_row + 1, len(country_data)):,}-{first_row + len(display_df):,} "
+                        f"of {len(country_data):,}, sorted by {sort_by} (descending)"
                     )
+                    st.dataframe(display_df, use_container_width=True, height=600)
+
+                    # Exports are written in chunks, and only when a button is clicked
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        st.download_button(
+                            label="Download filtered data as CSV",
+                            data=profile.timed("export csv", lambda: export_csv(country_data, sort_by)),
+                            file_name=f"{selected_country}_mobile_data.csv",
+                            mime="text/csv",
+                        )
+                    with col2:
+                        st.download_button(
+                            label="Download filtered data as Parquet",
+                            data=profile.timed("export parquet", lambda: export_parquet(country_data, sort_by)),
+                            file_name=f"{selected_country}_mobile_data.parquet",
+                            mime="application/vnd.apache.parquet",
+                        )
 
             # -----------------------------
-            # Tab 5: Raw Data
+            # Tab 6: Compare Countries
             # -----------------------------
-            with tab5:
-                st.subheader("Raw Data View")
-
-                col1, col2 = st.columns(2)
-                with col1:
-                    show_all = st.checkbox("Show all records", value=False)
-                with col2:
-                    sort_by = st.selectbox(
-                        "Sort by",
-                        options=country_data.columns.tolist(),
-                        index=0
-                        if "Date" not in country_data.columns
-                        else list(country_data.columns).index("Date"),
+            with tab6:
+                if tab_open(tab6):
+                    profile.mark("tab: Compare Countries")
+                    st.subheader("Compare Countries")
+
+                    compare = st.multiselect(
+                        "Countries to compare",
+                        countries,
+                        default=[selected_country] + [c for c in countries if c != selected_country][:3],
+                        help="Brand share, OS share, users and usage on each country's latest date",
                     )
 
-                if show_all:
-                    display_df = country_data.sort_values(sort_by, ascending=False)
-                else:
-                    display_df = country_data.sort_values(sort_by, ascending=False).head(20)
-
-                st.dataframe(display_df, use_container_width=True, height=600)
+                    # One groupby over Country x Date x Brand x OS feeds every chart below.
+                    # Generated data is grouped once for all countries, so changing the
+                    # selection is only a lookup; a dataset reads just the selected countries.
+                    if not compare:
+                        comparison = None
+                    elif dataset_path is not None:
+                        versions = tuple((c, partition_version(dataset_path, c)) for c in compare)
+                        comparison_key = ("comparison", dataset_path, versions, selected_range_code)
+
+                        def load_compared_rows():
+                            latest_dates = [
+                                dataset_cache.get_or_create(
+                                    ("latest", dataset_path, version, country),
+                                    lambda country=country: read_latest_date(dataset_path, country),
+                                )
+                                for country, version in versions
+                            ]
+                            latest_dates = [d for d in latest_dates if d is not None]
+                            # Read from the earliest window start, then trim each country to its own
+                            since = None
+                            if latest_dates:
+                                since = min(latest_dates) - pd.Timedelta(days=RANGE_DAYS[selected_range_code] - 1)
+                            with profile.stage("read compared countries"):
+                                rows = read_countries(dataset_path, compare, columns=TAB_COLUMNS["raw"], since=since)
+                            return filter_range(rows, selected_range_code)
+
+                        comparison = dataset_cache.get_or_create(
+                            comparison_key, profile.timed("build comparison", lambda: build_comparison(load_compared_rows()))
+                        )
+                    else:
+                        comparison_key = ("comparison", data_key)
+                        comparison = dataset_cache.get_or_create(
+                            comparison_key, profile.timed("build comparison", lambda: build_comparison(load_generated_data(data_key)))
+                        )
 
-                csv = display_df.to_csv(index=False)
-                st.download_button(
-                    label="Download filtered data as CSV",
-                    data=csv,
-                    file_name=f"{selected_country}_mobile_data.csv",
-                    mime="text/csv",
-                )
+                    if comparison is None:
+                        st.info("Select one or more countries to compare.")
+                    else:
+                        view = select_comparison(comparison, compare)
+                        compare_key = tuple(compare)
+                        comparison_charts = [
+                            ("brand_share", charts.comparison_brand_share_figure),
+                            ("os_share", charts.comparison_os_share_figure),
+                            ("brand_users", charts.comparison_users_figure),
+                            ("brand_usage", charts.comparison_usage_figure),
+                        ]
+                        available = [(kind, build) for kind, build in comparison_charts
+                                     if view[kind] is not None and not view[kind].empty]
+                        if available:
+                            for row in range(0, len(available), 2):
+                                for col, (kind, build) in zip(st.columns(2), available[row:row + 2]):
+                                    with col:
+                                        fig = cached_figure(
+                                            comparison_key, compare_key, f"compare_{kind}",
+                                            profile.timed(
+                                                f"figure: compare_{kind}",
+                                                lambda build=build, kind=kind: build(view[kind]),
+                                            ),
+                                        )
+                                        st.plotly_chart(fig, use_container_width=True)
+
+                            if view["brand_share"] is not None:
+                                st.markdown("**Brand market share on each country's latest date**")
+                                st.dataframe(
+                                    view["brand_share"].astype({"Country": str, "Brand": str}).pivot_table(
+                                        index="Country", columns="Brand", values="MarketShare", sort=False
+                                    ).round(2),
+                                    use_container_width=True,
+                                )
+                        else:
+                            st.info("No data found for the selected countries.")
         else:
             st.warning(f"No data found for {selected_country}.")
     else:
@@ -501,3 +762,23 @@ else:
     #     - Usage_Hours: Average daily usage in hours (numeric)
     #     """
     # )
+
+# -----------------------------
+# Rerun profile (opt-in, see instrumentation.py)
+# -----------------------------
+if profile.enabled:
+    profile.finish(country=selected_country, tab=st.session_state.get("active_tab"))
+    with st.sidebar.expander("🔬 Rerun profile"):
+        st.dataframe(profile.table(), use_container_width=True, hide_index=True)
+        st.caption(
+            f"Total {profile.total_seconds * 1000:.0f} ms from script start. Stages that hit a cache are not "
+            "listed; downloads are timed when they are generated and only exported."
+        )
+        col1, col2 = st.columns(2)
+        col1.download_button(
+            "JSON", data=json.dumps(profile.to_json(), default=str), file_name="rerun_profile.json",
+            mime="application/json",
+        )
+        col2.download_button(
+            "Prometheus", data=prometheus_text(), file_name="dashboard_stages.prom", mime="text/plain",
+        )
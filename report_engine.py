@@ -0,0 +1,371 @@
+import argparse
+import html
+import importlib.util
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+import charts
+from aggregates import TREND_KEYS, build_cubes
+from data_store import read_dataset
+from downsample import TREND_MAX_POINTS, downsample_lines
+from schema import enforce_schema
+from time_ranges import RANGE_LABELS, filter_range, generate_range_data
+
+"""
+Report Engine
+
+Computes the dashboard's analytics (metrics, trend lines, brand and OS
+distribution, usage patterns) for every country without Streamlit, and
+renders static reports for all of them:
+
+    python report_engine.py --dataset mobile_data_store --output reports
+    python report_engine.py --generate --seed 42 --country-multiplier 50 --formats html json png
+
+The rollups of all countries come from one vectorized pass
+(aggregates.build_cubes). The reports are rendered in parallel: countries
+are split into batches across a process pool, and each worker builds the
+same figures as the dashboard (charts.py). The output directory gets one
+``<country>.html`` / ``<country>.json`` (and ``<country>-<chart>.png``)
+per country, plus an ``index.html`` and ``index.json`` listing them all.
+
+PNG export needs the optional ``kaleido`` package.
+"""
+
+FORMATS = ("html", "json", "png")
+PLOTLYJS_FILE = "plotly.min.js"
+# Countries per worker task; plotly is imported once per worker, not per country
+BATCHES_PER_WORKER = 4
+
+
+def load_source(path):
+    """Read a dataset directory, .arrow file, Excel workbook or CSV file."""
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix in (".xlsx", ".xlsm"):
+        from excel_ingest import cached_sheet
+
+        cached = cached_sheet(path, ingest=True)
+        if cached is None:
+            raise ValueError(f"No data found in workbook '{path}'")
+        return read_dataset(cached)
+    if suffix == ".csv":
+        return enforce_schema(pd.read_csv(path))
+    return read_dataset(path)
+
+
+def build_country_reports(data, max_points=TREND_MAX_POINTS):
+    """Rollups of every country, in one pass, with trend lines downsampled.
+
+    Returns ``{country: cubes}`` as ``build_cubes`` does.
+    """
+    reports = build_cubes(data)
+    for cubes in reports.values():
+        for name, by in TREND_KEYS.items():
+            if cubes[name] is not None:
+                cubes[name] = downsample_lines(cubes[name], "Date", "MarketShare", by, max_points)
+    return reports
+
+
+def country_slug(country):
+    """File name stem for a country."""
+    slug = re.sub(r"[^\w-]+", "-", str(country), flags=re.UNICODE).strip("-").lower()
+    return slug or "country"
+
+
+def country_slugs(countries):
+    """Unique file name stems for many countries, in sorted order.
+
+    Names that clean to the same slug (e.g. "United States" and
+    "United-States") are told apart with a numeric suffix: the first in
+    sorted order keeps the plain slug, the next get "-2", "-3", ...
+    """
+    slugs = {}
+    taken = set()
+    for country in sorted(countries, key=str):
+        base = slug = country_slug(country)
+        suffix = 1
+        while slug in taken:
+            suffix += 1
+            slug = f"{base}-{suffix}"
+        taken.add(slug)
+        slugs[country] = slug
+    return slugs
+
+
+def _records(frame):
+    return json.loads(frame.to_json(orient="records", date_format="iso"))
+
+
+def _metrics_json(metrics):
+    return {
+        key: value.isoformat() if isinstance(value, pd.Timestamp) else value
+        for key, value in (metrics or {}).items()
+        if pd.notna(value)
+    }
+
+
+def report_json(country, cubes, range_code):
+    """A country's metrics and rollups as a JSON-serializable dict."""
+    return {
+        "country": country,
+        "range": range_code,
+        "metrics": _metrics_json(cubes.get("metrics")),
+        **{
+            name: _records(frame)
+            for name, frame in cubes.items()
+            if name != "metrics" and frame is not None
+        },
+    }
+
+
+def _metric_html(label, value):
+    return (
+        "<div class='metric'>"
+        f"<div class='label'>{html.escape(label)}</div><div class='value'>{html.escape(value)}</div>"
+        "</div>"
+    )
+
+
+def report_html(country, cubes, figures, range_code, plotlyjs_src):
+    """A self-contained HTML report of one country (plotly.js is linked)."""
+    metrics = cubes.get("metrics") or {}
+    cards = []
+    if pd.notna(metrics.get("start")):
+        cards.append(_metric_html("Start Date", str(metrics["start"].date())))
+    if pd.notna(metrics.get("end")):
+        cards.append(_metric_html("End Date", str(metrics["end"].date())))
+    if pd.notna(metrics.get("avg_share")):
+        cards.append(_metric_html("Average Market Share", f"{metrics['avg_share']:.2f}"))
+    if pd.notna(metrics.get("avg_usage")):
+        cards.append(_metric_html("Average Daily Usage (hours)", f"{metrics['avg_usage']:.2f}"))
+
+    sections = []
+    for kind, figure in figures.items():
+        sections.append(f"<section>{figure.to_html(full_html=False, include_plotlyjs=False)}</section>")
+        table = cubes.get(kind) if kind in ("brand_share", "os_share") else None
+        if table is not None:
+            sections.append(
+                "<section>" + table.rename(columns={"MarketShare": "Share"}).to_html(index=False, float_format="%.2f")
+                + "</section>"
+            )
+
+    title = f"Market Analysis - {country}"
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{html.escape(title)}</title>
+<script src="{html.escape(plotlyjs_src)}"></script>
+<style>
+    body {{ font-family: sans-serif; margin: 2em; }}
+    h1 {{ color: #1f77b4; }}
+    .metrics {{ display: flex; gap: 2em; margin: 1em 0; }}
+    .metric {{ background-color: #f0f2f6; padding: 20px; border-radius: 10px; text-align: center; }}
+    .metric .label {{ font-size: 14px; }}
+    .metric .value {{ font-size: 20px; font-weight: bold; }}
+    table {{ border-collapse: collapse; }}
+    td, th {{ border: 1px solid #ddd; padding: 4px 8px; }}
+</style>
+</head>
+<body>
+<h1>{html.escape(title)}</h1>
+<p>{html.escape(RANGE_LABELS.get(range_code, "All data"))}</p>
+<div class="metrics">{''.join(cards)}</div>
+{''.join(sections)}
+</body>
+</html>
+"""
+
+
+def render_country(country, cubes, output_dir, formats=("html", "json"), range_code=None, plotlyjs_src=PLOTLYJS_FILE,
+                   slug=None):
+    """Write one country's reports; return its index entry.
+
+    ``slug`` is the file name stem; ``country_slug(country)`` by default.
+    """
+    output_dir = Path(output_dir)
+    slug = slug or country_slug(country)
+    files = {}
+
+    if "json" in formats:
+        path = output_dir / f"{slug}.json"
+        path.write_text(json.dumps(report_json(country, cubes, range_code), indent=2))
+        files["json"] = path.name
+
+    if "html" in formats or "png" in formats:
+        figures = charts.country_figures(cubes, RANGE_LABELS.get(range_code, "All data"))
+        if "html" in formats:
+            path = output_dir / f"{slug}.html"
+            path.write_text(report_html(country, cubes, figures, range_code, plotlyjs_src), encoding="utf-8")
+            files["html"] = path.name
+        if "png" in formats:
+            files["png"] = []
+            for kind, figure in figures.items():
+                path = output_dir / f"{slug}-{kind}.png"
+                figure.write_image(path)
+                files["png"].append(path.name)
+
+    return {"country": country, "metrics": _metrics_json(cubes.get("metrics")), "files": files}
+
+
+def _render_batch(batch, output_dir, formats, range_code, plotlyjs_src):
+    """Process pool task: render a batch of (country, slug, cubes) triples."""
+    return [
+        render_country(country, cubes, output_dir, formats, range_code, plotlyjs_src, slug)
+        for country, slug, cubes in batch
+    ]
+
+
+def _index_html(entries, range_code):
+    rows = []
+    for entry in entries:
+        links = " ".join(
+            f"<a href='{html.escape(name)}'>{fmt}</a>"
+            for fmt, name in entry["files"].items() if isinstance(name, str)
+        )
+        metrics = entry["metrics"]
+        rows.append(
+            f"<tr><td>{html.escape(str(entry['country']))}</td>"
+            f"<td>{metrics.get('start', '')[:10]}</td><td>{metrics.get('end', '')[:10]}</td>"
+            f"<td>{metrics.get('avg_share', float('nan')):.2f}</td><td>{metrics.get('avg_usage', float('nan')):.2f}</td>"
+            f"<td>{links}</td></tr>"
+        )
+    return f"""<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>Mobile Market Reports</title>
+<style>body {{ font-family: sans-serif; margin: 2em; }} td, th {{ border: 1px solid #ddd; padding: 4px 8px; }}
+table {{ border-collapse: collapse; }}</style></head>
+<body>
+<h1>Mobile Market Reports</h1>
+<p>{html.escape(RANGE_LABELS.get(range_code, "All data"))} - {len(entries)} countries</p>
+<table>
+<tr><th>Country</th><th>Start</th><th>End</th><th>Avg. Market Share</th><th>Avg. Daily Usage</th><th>Reports</th></tr>
+{''.join(rows)}
+</table>
+</body>
+</html>
+"""
+
+
+def render_reports(reports, output_dir, formats=("html", "json"), range_code=None, workers=None, plotlyjs="directory"):
+    """Render the reports of many countries across a process pool.
+
+    Args:
+        reports: ``{country: cubes}`` from ``build_country_reports``.
+        output_dir: Directory to write the reports to (created if needed).
+        formats: Any of "html", "json" and "png".
+        range_code: Time range the rollups cover (for titles and JSON).
+        workers: Worker processes; defaults to the CPU count.
+        plotlyjs: "directory" writes plotly.min.js once next to the HTML
+            reports (works offline); "cdn" links it from the Plotly CDN.
+
+    Returns the index: one entry per country with its metrics and files.
+    Countries whose names give the same file name get a numeric suffix
+    (see ``country_slugs``).
+    """
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        raise ValueError(f"Unknown report formats: {', '.join(sorted(unknown))}")
+    if "png" in formats and importlib.util.find_spec("kaleido") is None:
+        raise RuntimeError("PNG reports need the kaleido package (pip install kaleido)")
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    plotlyjs_src = PLOTLYJS_FILE
+    if "html" in formats:
+        from plotly.offline import get_plotlyjs, get_plotlyjs_version
+
+        if plotlyjs == "cdn":
+            plotlyjs_src = f"https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js"
+        else:
+            (output_dir / PLOTLYJS_FILE).write_text(get_plotlyjs(), encoding="utf-8")
+
+    slugs = country_slugs(reports)
+    items = [(country, slugs[country], reports[country]) for country in slugs]
+    workers = min(workers or os.cpu_count() or 1, max(len(items), 1))
+    n_batches = min(len(items), workers * BATCHES_PER_WORKER) or 1
+    batches = [items[i::n_batches] for i in range(n_batches)]
+    tasks = (
+        batches,
+        [output_dir] * len(batches),
+        [tuple(formats)] * len(batches),
+        [range_code] * len(batches),
+        [plotlyjs_src] * len(batches),
+    )
+    if workers == 1:
+        results = list(map(_render_batch, *tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_render_batch, *tasks))
+    entries = sorted((entry for batch in results for entry in batch), key=lambda entry: str(entry["country"]))
+
+    index = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "range": range_code,
+        "formats": list(formats),
+        "countries": entries,
+    }
+    (output_dir / "index.json").write_text(json.dumps(index, indent=2))
+    if "html" in formats:
+        (output_dir / "index.html").write_text(_index_html(entries, range_code), encoding="utf-8")
+    return index
+
+
+def main():
+    """Main function"""
+
+    parser = argparse.ArgumentParser(description="Render market reports for every country without Streamlit.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--dataset", help="Dataset directory, .arrow file, Excel workbook or CSV file")
+    source.add_argument("--generate", action="store_true", help="Report on generated sample data")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for --generate")
+    parser.add_argument("--country-multiplier", type=int, default=1, help="Synthetic copies of each country (--generate)")
+    parser.add_argument("--range", dest="range_code", choices=list(RANGE_LABELS), default="1y",
+                        help="Time range ending at each country's latest date")
+    parser.add_argument("--countries", nargs="+", help="Only report on these countries")
+    parser.add_argument("--output", default="reports", help="Directory to write the reports to")
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=["html", "json"], help="Report formats")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--plotlyjs", choices=["directory", "cdn"], default="directory",
+                        help="Write plotly.min.js next to the reports or link the Plotly CDN")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.generate:
+        data = generate_range_data(args.range_code, args.seed, args.country_multiplier)
+    else:
+        if not Path(args.dataset).exists():
+            print(f"❌ ERROR: Dataset '{args.dataset}' not found!", file=sys.stderr)
+            sys.exit(1)
+        data = load_source(args.dataset)
+    if args.countries:
+        data = data[data["Country"].isin(args.countries).to_numpy()].reset_index(drop=True)
+    data = filter_range(data, args.range_code)
+    if data.empty:
+        print("❌ ERROR: No rows to report on", file=sys.stderr)
+        sys.exit(1)
+    print(f"📊 Loaded {len(data):,} rows in {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    reports = build_country_reports(data)
+    print(f"🧮 Aggregated {len(reports)} countries in {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    try:
+        index = render_reports(reports, args.output, args.formats, args.range_code, args.workers, args.plotlyjs)
+    except (RuntimeError, ValueError) as e:
+        print(f"❌ ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"✅ Rendered {len(index['countries'])} reports ({', '.join(args.formats)}) "
+          f"in {time.perf_counter() - start:.2f}s -> {args.output}")
+    sys.exit(0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+"""
+Compact Data Schema
+
+Canonical in-memory types for mobile market data, enforced when data is
+generated or loaded so that downstream code never has to re-coerce:
+
+- Country, Brand, OS: categorical
+- Date: datetime64
+- Market_Share, Users_Millions, Usage_Hours: float32
+"""
+
+COLUMNS = ['Country', 'Date', 'Brand', 'OS', 'Market_Share', 'Users_Millions', 'Usage_Hours']
+CATEGORY_COLUMNS = ['Country', 'Brand', 'OS']
+DATE_COLUMN = 'Date'
+METRIC_COLUMNS = ['Market_Share', 'Users_Millions', 'Usage_Hours']
+METRIC_DTYPE = np.float32
+DATE_DTYPE = 'datetime64[ns]'
+# The one text format accepted for dates. A fixed format makes parsing
+# independent of how a file is chunked: without it pandas guesses the
+# format from the first value of each chunk.
+DATE_FORMAT = '%Y-%m-%d'
+
+
+def parse_dates(values):
+    """Parse a Date column; text that is not YYYY-MM-DD becomes NaT.
+
+    Values that are already datetimes (datetime64 columns, or date cells
+    read from Excel) are kept as they are.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values.dtype):
+        return values
+    return pd.to_datetime(values, format=DATE_FORMAT, errors='coerce')
+
+
+def enforce_schema(df):
+    """Cast the known columns of ``df`` to the compact schema.
+
+    Columns that already have the right type are left untouched (no copy).
+    Unparseable dates and numbers become NaT/NaN. Returns a new frame only
+    if something had to be cast.
+    """
+    casts = {}
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            casts[column] = df[column].astype('category')
+    if DATE_COLUMN in df.columns and df[DATE_COLUMN].dtype != DATE_DTYPE:
+        casts[DATE_COLUMN] = pd.to_datetime(df[DATE_COLUMN], errors='coerce').astype(DATE_DTYPE)
+    for column in METRIC_COLUMNS:
+        if column in df.columns and df[column].dtype != METRIC_DTYPE:
+            casts[column] = pd.to_numeric(df[column], errors='coerce').astype(METRIC_DTYPE)
+    return df.assign(**casts) if casts else df
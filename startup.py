@@ -0,0 +1,77 @@
+import base64
+import functools
+import importlib
+import io
+import os
+import sys
+import time
+from pathlib import Path
+
+from instrumentation import profile_mode
+
+"""
+Startup and Static Assets
+
+Streamlit runs the whole dashboard script again on every interaction, so
+anything done at the top of the script is paid per rerun. This module
+keeps that work per process instead:
+
+- Static files (the logo) are read, resized and base64-encoded once and
+  reused until the file changes. The favicon and header logo are passed to
+  Streamlit as small ``data:`` URLs, which it forwards without decoding.
+- Heavy modules (plotly, PIL) are imported on first use with
+  ``import_module``, which also records how long the import took.
+- Startup timings (imports, first paint) are recorded once per process
+  and shown in the dashboard sidebar. With profiling enabled
+  (``DASHBOARD_PROFILE``, see instrumentation.py) they are also printed
+  to stderr.
+"""
+
+# Favicons are drawn at 16-32 px; 64 px stays sharp on high-DPI screens
+FAVICON_SIZE = 64
+# The header logo is 110 px wide; twice that for high-DPI screens
+LOGO_SIZE = 220
+
+# Seconds per startup stage, first occurrence in this process
+PROCESS_TIMINGS = {}
+
+
+def record_timing(name, seconds):
+    """Record a startup timing once per process; later calls are ignored."""
+    if name in PROCESS_TIMINGS:
+        return False
+    PROCESS_TIMINGS[name] = seconds
+    if profile_mode() is not None:
+        print(f"⏱️  {name}: {seconds * 1000:.0f} ms", file=sys.stderr)
+    return True
+
+
+def import_module(name):
+    """Import a module on first use, recording how long the import took."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    record_timing(f"import {name}", time.perf_counter() - start)
+    return module
+
+
+@functools.lru_cache(maxsize=32)
+def _image_data_url(path, mtime_ns, max_size):
+    Image = import_module("PIL.Image")
+
+    with Image.open(path) as image:
+        image.thumbnail((max_size, max_size))
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG", optimize=True)
+    return "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode()
+
+
+def image_data_url(path, max_size):
+    """Return an image, scaled to fit ``max_size`` pixels, as a PNG ``data:`` URL.
+
+    The result is cached per process and rebuilt when the file changes.
+    """
+    path = Path(path)
+    return _image_data_url(str(path), os.stat(path).st_mtime_ns, max_size)
@@ -0,0 +1,112 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+"""
+Raw Data Paging and Export
+
+The Raw Data tab shows one page of a country's rows sorted by a column.
+Sorting every row to show 20 of them is wasteful, so a page is cut from a
+top-k selection (``np.partition``, like ``DataFrame.nlargest``) of only
+the rows up to the end of that page.
+
+Exports are written chunk by chunk into an in-memory binary buffer, which
+``st.download_button`` accepts from a deferred callable; no full copy of
+the sorted frame or of the CSV text is held besides the output itself.
+"""
+
+EXPORT_CHUNK_ROWS = 100_000
+
+
+def sort_key(series, ascending=False):
+    """Float64 key whose ascending order is the requested order of ``series``.
+
+    Missing values always sort last, as with ``sort_values``. Ordered
+    categorical columns rank in category order; unordered ones and other
+    non-numeric columns rank by value (label).
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        if not series.cat.ordered:
+            # Rank each category by its label, so "Others" sorts after "Google"
+            rank = np.empty(len(series.cat.categories), dtype=np.int64)
+            rank[series.cat.categories.argsort()] = np.arange(len(rank))
+            codes = np.where(codes >= 0, rank[codes], -1)
+    elif pd.api.types.is_datetime64_any_dtype(series.dtype):
+        values = series.to_numpy(dtype="datetime64[ns]")
+        key = np.where(np.isnat(values), np.nan, values.astype(np.int64).astype(float))
+        codes = None
+    elif pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+        key = series.to_numpy(dtype=float, na_value=np.nan)
+        codes = None
+    else:
+        codes, _ = pd.factorize(series, sort=True)
+    if codes is not None:
+        key = np.where(codes >= 0, codes, np.nan)
+    key = key if ascending else -key
+    return np.where(np.isnan(key), np.inf, key)
+
+
+def _order(frame, column, ascending, k=None):
+    """Row positions of the first ``k`` rows in sorted order (all rows if None).
+
+    Ties keep their original order, so consecutive pages never overlap.
+    """
+    key = sort_key(frame[column], ascending)
+    if k is None or k >= len(key):
+        return np.argsort(key, kind="stable")
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    # Every row up to the k-th smallest key, ties included, then a stable sort
+    kth = np.partition(key, k - 1)[k - 1]
+    candidates = np.flatnonzero(key <= kth)
+    return candidates[np.argsort(key[candidates], kind="stable")][:k]
+
+
+def page_rows(frame, column, page, page_size, ascending=False):
+    """Return one page (0-based) of ``frame`` sorted by ``column``.
+
+    Only the rows up to the end of the page are selected and sorted.
+    """
+    stop = min((page + 1) * page_size, len(frame))
+    start = min(page * page_size, stop)
+    order = _order(frame, column, ascending, k=stop)
+    return frame.take(order[start:stop])
+
+
+def _sorted_chunks(frame, column, ascending, chunk_rows):
+    order = _order(frame, column, ascending)
+    for start in range(0, len(order), chunk_rows):
+        yield frame.take(order[start:start + chunk_rows])
+
+
+def export_csv(frame, column, ascending=False, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Write ``frame`` sorted by ``column`` as CSV, chunk by chunk.
+
+    Returns an ``io.BytesIO`` positioned at the start.
+    """
+    output = io.BytesIO()
+    for i, chunk in enumerate(_sorted_chunks(frame, column, ascending, chunk_rows)):
+        output.write(chunk.to_csv(index=False, header=i == 0).encode())
+    if len(frame) == 0:
+        output.write(frame.to_csv(index=False).encode())
+    output.seek(0)
+    return output
+
+
+def export_parquet(frame, column, ascending=False, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Write ``frame`` sorted by ``column`` as Parquet, one row group per chunk.
+
+    Returns an ``io.BytesIO`` positioned at the start.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    output = io.BytesIO()
+    schema = pa.Schema.from_pandas(frame, preserve_index=False)
+    with pq.ParquetWriter(output, schema) as writer:
+        for chunk in _sorted_chunks(frame, column, ascending, chunk_rows):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+    output.seek(0)
+    return output
@@ -0,0 +1,50 @@
+from aggregates import build_comparison, build_cubes
+from country_index import CountryIndex
+from dataset_cache import DatasetCache, estimate_size
+from generate_sample_data import generate_sample_data
+
+
+def test_nested_frames_are_sized_in_full():
+    cubes = build_cubes(generate_sample_data(rng=1, verbose=False, periods=60, freq='daily'))
+    frames = sum(
+        int(frame.memory_usage(deep=True).sum())
+        for rollups in cubes.values()
+        for frame in rollups.values()
+        if hasattr(frame, "memory_usage")
+    )
+    assert estimate_size(cubes) >= frames
+
+
+def test_cached_cubes_count_against_the_bound():
+    cubes = build_cubes(generate_sample_data(rng=1, verbose=False, periods=60, freq='daily'))
+    size = estimate_size(cubes)
+    cache = DatasetCache(max_bytes=int(size * 1.5), ttl_seconds=None)
+
+    cache.get_or_create("first", lambda: cubes)
+    assert cache.stats()["bytes"] == size
+    cache.get_or_create("second", lambda: dict(cubes))
+    assert cache.get("first") is None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cached_comparison_counts_against_the_bound():
+    comparison = build_comparison(generate_sample_data(rng=1, verbose=False, periods=60, freq='daily'))
+    frames = sum(int(frame.memory_usage(deep=True).sum()) for frame in comparison.values() if frame is not None)
+    size = estimate_size(comparison)
+    assert size >= frames
+
+    cache = DatasetCache(max_bytes=int(size * 1.5), ttl_seconds=None)
+    cache.get_or_create(("comparison", "first"), lambda: comparison)
+    assert cache.stats()["bytes"] == size
+
+    # A comparison larger than the whole cache is not kept at all
+    small = DatasetCache(max_bytes=frames // 2, ttl_seconds=None)
+    small.get_or_create(("comparison", "first"), lambda: comparison)
+    assert small.stats()["entries"] == 0
+
+
+def test_cached_country_index_counts_the_frame_it_holds():
+    data = generate_sample_data(rng=1, verbose=False, periods=60, freq='daily')
+    index = CountryIndex(data)
+    assert not index.reordered
+    assert estimate_size(index) >= int(data.memory_usage(deep=True).sum())
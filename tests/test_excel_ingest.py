@@ -0,0 +1,33 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import write_excel
+from data_store import read_dataset
+from excel_ingest import cached_sheet, ingest_excel, load_manifest
+from generate_sample_data import generate_sample_data
+
+
+def test_concurrent_ingests_keep_every_sheet(tmp_path):
+    workbook = tmp_path / "data.xlsx"
+    write_excel(generate_sample_data(rng=1, verbose=False), workbook)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        manifests = list(pool.map(lambda _: ingest_excel(workbook, chunk_rows=100, force=True), range(4)))
+
+    assert all(len(manifest["sheets"]) == 1 for manifest in manifests)
+    assert len(load_manifest(workbook)["sheets"]) == 1
+    assert cached_sheet(workbook) is not None
+    assert not list(workbook.parent.glob(".columnar_cache/*.tmp"))
+
+
+def test_conversion_does_not_depend_on_chunk_rows(tmp_path):
+    workbook = tmp_path / "mixed.xlsx"
+    frame = generate_sample_data(rng=1, verbose=False).head(6).astype({"Date": object})
+    frame["Date"] = ["2025-01-01 00:00:00"] * 3 + ["2025-02-01"] * 3
+    write_excel(frame, workbook)
+
+    results = []
+    for chunk_rows in (2, 3, 100):
+        manifest = ingest_excel(workbook, chunk_rows=chunk_rows, force=True)
+        dates = read_dataset(cached_sheet(workbook))["Date"]
+        results.append((manifest["sheets"][0]["lossless"], dates.isna().tolist()))
+    assert results == [(False, [True] * 3 + [False] * 3)] * 3
@@ -0,0 +1,24 @@
+import pandas as pd
+
+from generate_sample_data import generate_next_periods, generate_sample_data, iter_sample_data
+
+START = '2025-01-01'
+
+
+def test_appended_period_continues_the_same_series():
+    full = generate_sample_data(rng=42, verbose=False, periods=14, start_date=START)
+    existing = generate_sample_data(rng=42, verbose=False, periods=13, start_date=START)
+    appended = generate_sample_data(rng=42, verbose=False, periods=1, start_date=START, first_period=13)
+
+    last = full[full['Date'] == full['Date'].max()].reset_index(drop=True)
+    pd.testing.assert_frame_equal(appended, last)
+    pd.testing.assert_frame_equal(existing, full[full['Date'] < full['Date'].max()].reset_index(drop=True))
+    pd.testing.assert_frame_equal(generate_next_periods(existing, rng=42), last)
+
+
+def test_streamed_batches_equal_one_shot_generation():
+    options = dict(rng=7, periods=40, freq='daily', country_multiplier=2)
+    expected = generate_sample_data(verbose=False, **options)
+    for batch_rows in (100, 1_000):
+        streamed = pd.concat(list(iter_sample_data(batch_rows, **options)), ignore_index=True)
+        pd.testing.assert_frame_equal(streamed, expected)
@@ -0,0 +1,18 @@
+import json
+
+from generate_sample_data import generate_sample_data
+from report_engine import build_country_reports, render_reports
+
+
+def test_countries_with_the_same_slug_get_separate_files(tmp_path):
+    data = generate_sample_data(rng=1, verbose=False, periods=30, freq='daily')
+    first, second = data["Country"].cat.categories[:2]
+    data = data[data["Country"].isin([first, second]).to_numpy()].reset_index(drop=True)
+    data["Country"] = data["Country"].map({first: "United States", second: "United-States"}).astype(str)
+
+    index = render_reports(build_country_reports(data), tmp_path, formats=("json",), workers=1)
+
+    files = {entry["country"]: entry["files"]["json"] for entry in index["countries"]}
+    assert files == {"United States": "united-states.json", "United-States": "united-states-2.json"}
+    for country, name in files.items():
+        assert json.loads((tmp_path / name).read_text())["country"] == country
@@ -0,0 +1,45 @@
+import io
+
+import pandas as pd
+import pytest
+from streamlit.runtime.download_data_util import convert_data_to_bytes_and_infer_mime
+
+from aggregates import RENAME_MAP
+from generate_sample_data import generate_sample_data
+from table_view import export_csv, export_parquet, page_rows
+
+
+@pytest.fixture(scope="module")
+def frame():
+    return generate_sample_data(rng=3, verbose=False).rename(columns=RENAME_MAP)
+
+
+def download_bytes(callable_):
+    """Run a deferred download callable through Streamlit's conversion."""
+    data, _ = convert_data_to_bytes_and_infer_mime(callable_(), unsupported_error=TypeError("unsupported"))
+    return data
+
+
+def expected_order(frame, column, ascending=False):
+    key = frame[column].astype(str) if isinstance(frame[column].dtype, pd.CategoricalDtype) else frame[column]
+    return frame.loc[key.sort_values(ascending=ascending, kind="stable").index].reset_index(drop=True)
+
+
+def test_csv_download_is_accepted_by_streamlit(frame):
+    data = download_bytes(lambda: export_csv(frame, "MarketShare", chunk_rows=100))
+    exported = pd.read_csv(io.BytesIO(data))
+    assert len(exported) == len(frame)
+    assert exported["MarketShare"].is_monotonic_decreasing
+
+
+def test_parquet_download_is_accepted_by_streamlit(frame):
+    data = download_bytes(lambda: export_parquet(frame, "Brand", ascending=True, chunk_rows=100))
+    exported = pd.read_parquet(io.BytesIO(data))
+    assert exported["Brand"].astype(str).tolist() == sorted(frame["Brand"].astype(str))
+
+
+def test_categoricals_sort_by_label(frame):
+    for ascending in (True, False):
+        expected = expected_order(frame, "Brand", ascending)
+        pages = [page_rows(frame, "Brand", page, 50, ascending) for page in range(3)]
+        pd.testing.assert_frame_equal(pd.concat(pages, ignore_index=True), expected.head(150))
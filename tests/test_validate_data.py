@@ -0,0 +1,35 @@
+import pytest
+
+from validate_data import CHUNK_ROWS, summarize_report, validate_file
+
+HEADER = "Country,Date,Brand,OS,Market_Share,Users_Millions,Usage_Hours\n"
+ROW = "Canada,{date},Apple,iOS,50.0,10.0,4.5\n"
+
+
+def write_rows(path, dates):
+    path.write_text(HEADER + "".join(ROW.format(date=d) for d in dates))
+
+
+@pytest.fixture
+def mixed_dates(tmp_path):
+    path = tmp_path / "mixed.csv"
+    write_rows(path, ["2025-01-01 00:00:00"] * 3 + ["2025-02-01"] * 3 + ["2025-13-01", "2025-03-01"])
+    return path
+
+
+def summary(path, chunk_rows):
+    result = summarize_report(validate_file(path, chunk_rows=chunk_rows))
+    result.pop("file")
+    return result
+
+
+def test_report_does_not_depend_on_chunk_rows(mixed_dates):
+    expected = summary(mixed_dates, CHUNK_ROWS)
+    for chunk_rows in (1, 2, 3, 4, 7):
+        assert summary(mixed_dates, chunk_rows) == expected
+
+
+def test_only_dates_that_are_not_yyyy_mm_dd_are_violations(mixed_dates):
+    result = summary(mixed_dates, CHUNK_ROWS)
+    assert result["violations"]["Date: date"] == {"count": 4, "sample_rows": [0, 1, 2, 6]}
+    assert result["date_range"] == ["2025-02-01", "2025-03-01"]
@@ -0,0 +1,61 @@
+import os
+
+from validate_data import summarize_report, validate_file
+from validation_cache import ValidationCache
+
+HEADER = "Country,Date,Brand,OS,Market_Share,Users_Millions,Usage_Hours\n"
+ROW = "{country},2025-01-01,Apple,iOS,50.0,10.0,4.5\n"
+
+
+def write_rows(path, countries):
+    path.write_text(HEADER + "".join(ROW.format(country=c) for c in countries))
+
+
+def test_same_size_edit_in_an_early_block_is_revalidated(tmp_path):
+    data = tmp_path / "data.csv"
+    countries = [f"Country{i}" for i in range(9)] * 20
+    write_rows(data, countries)
+    cache = ValidationCache(tmp_path / "cache", block_bytes=256)
+
+    first = validate_file(data, cache=cache)
+    assert first["cache"] == "miss"
+    assert first["unique"]["Country"] == 9
+
+    # Same length, different country in the first block, new mtime
+    countries[0] = "CountryX"
+    write_rows(data, countries)
+    stat = os.stat(data)
+    os.utime(data, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    second = validate_file(data, cache=cache)
+    assert second["cache"] == "miss"
+    assert second["unique"]["Country"] == 10
+
+
+def test_unchanged_file_is_a_hit(tmp_path):
+    data = tmp_path / "data.csv"
+    write_rows(data, ["Canada", "Japan"])
+    cache = ValidationCache(tmp_path / "cache")
+
+    validate_file(data, cache=cache)
+    assert validate_file(data, cache=cache)["cache"] == "hit"
+
+
+def test_append_gives_the_same_report_as_a_full_validation(tmp_path):
+    data = tmp_path / "data.csv"
+    data.write_text(HEADER + "".join(ROW.format(country=f"Country{i}") for i in range(5)))
+    cache = ValidationCache(tmp_path / "cache", block_bytes=256)
+    validate_file(data, cache=cache)
+
+    # A tail mixing formats: only the YYYY-MM-DD rows are valid dates
+    tail = ["Canada,2030-01-01 00:00:00,Apple,iOS,50.0,10.0,4.5\n"] * 3
+    tail += ["Japan,2026-02-01,Sony,Android,abc,1.0,3.0\n"] * 3
+    with open(data, "a") as f:
+        f.writelines(tail)
+
+    appended = validate_file(data, chunk_rows=2, cache=cache)
+    assert appended["cache"] == "append"
+    cold = validate_file(data)
+    assert summarize_report(appended) | {"cache": None} == summarize_report(cold)
+    assert cold["date_range"] == ["2025-01-01", "2026-02-01"]
+    assert cold["rules"]["Date: date"]["violations"] == 3
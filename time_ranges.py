@@ -0,0 +1,51 @@
+from datetime import date, timedelta
+
+import pandas as pd
+from generate_sample_data import FREQUENCIES, generate_sample_data
+
+"""
+Time Ranges
+
+The time ranges offered by the dashboard and the report engine, and how
+each one is applied: generated data covers exactly the range (a bounded
+number of periods ending today), and existing data is cut to the range
+ending at each country's latest date.
+"""
+
+# Time ranges: label, days covered and the (frequency, periods) generated for them
+RANGE_LABELS = {
+    "7d": "Last 7 days",
+    "30d": "Last 30 days",
+    "1y": "Last year",
+    "5y": "Last 5 years",
+}
+RANGE_DAYS = {"7d": 7, "30d": 30, "1y": 365, "5y": 1826}
+GENERATION_RANGES = {
+    "7d": ("daily", 7),
+    "30d": ("daily", 30),
+    "1y": ("monthly", 13),
+    "5y": ("monthly", 61),
+}
+
+
+def generate_range_data(range_code, seed=None, country_multiplier=1, today=None, verbose=False):
+    """Generate sample data covering a time range that ends today."""
+    freq, periods = GENERATION_RANGES[range_code]
+    start_date = (today or date.today()) - timedelta(days=(periods - 1) * FREQUENCIES[freq])
+    return generate_sample_data(
+        rng=seed, verbose=verbose, periods=periods, freq=freq, start_date=start_date,
+        country_multiplier=country_multiplier,
+    )
+
+
+def filter_range(data, range_code):
+    """Keep each country's rows within the range ending at its latest date.
+
+    This matches the dashboard, which reads a dataset country by country
+    from the country's latest date back.
+    """
+    if range_code is None or "Date" not in data.columns:
+        return data
+    latest = data.groupby("Country", observed=True)["Date"].transform("max")
+    keep = data["Date"] >= latest - pd.Timedelta(days=RANGE_DAYS[range_code] - 1)
+    return data[keep.to_numpy()].reset_index(drop=True)
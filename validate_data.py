@@ -1,155 +1,356 @@
 import pandas as pd
+import argparse
+import glob
+import json
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from schema import CATEGORY_COLUMNS, COLUMNS, DATE_COLUMN, METRIC_COLUMNS, parse_dates
+from validation_cache import CACHE_DIR, ValidationCache
 
 """
-Excel Data Validator
-Checks if your Excel file matches the required format for the Mobile Analytics Dashboard
+Data Validator
+Checks if your data file matches the required format for the Mobile Analytics Dashboard
+
+Files are read and checked chunk by chunk, so memory stays bounded however
+large the file is. Supported inputs: Excel (.xlsx), CSV, Parquet, Arrow IPC
+(.arrow/.feather) and partitioned dataset directories (see data_store.py).
+Workbooks converted with excel_ingest.py are read from their Arrow copy.
+
+Batch mode validates every file under a directory or glob across a process
+pool and emits one JSON summary per file:
+
+    python validate_data.py incoming/ --format ndjson --workers 8
+
+Results are cached per file in .validation_cache/: unchanged files are
+skipped and rows appended to a CSV file are validated on their own (see
+validation_cache.py). Use --no-cache to always re-read everything.
 """
 
-REQUIRED_COLUMNS = ['Country', 'Date', 'Brand', 'OS', 'Market_Share', 'Users_Millions', 'Usage_Hours']
+REQUIRED_COLUMNS = COLUMNS
 
-def validate_excel_file(file_path):
-    """Validate Excel file structure and data types"""
-    
-    print(f"\n{'='*60}")
-    print(f"📋 Validating Excel File: {file_path}")
-    print(f"{'='*60}\n")
-    
-    # Check if file exists
+# File types picked up when a plain directory is given in batch mode
+DATA_SUFFIXES = ('.xlsx', '.xlsm', '.xls', '.csv', '.parquet', '.arrow', '.feather', '.ipc')
+
+# Rows per chunk and offending row indices kept per rule
+CHUNK_ROWS = 250_000
+SAMPLE_ROWS = 5
+
+# (rule name, column, kind, message)
+RULES = (
+    [(f"{col}: text", col, "text", "Must contain only text values") for col in CATEGORY_COLUMNS]
+    + [(f"{DATE_COLUMN}: date", DATE_COLUMN, "date", "Must be in YYYY-MM-DD format")]
+    + [(f"{col}: numeric", col, "numeric", "Must contain only numeric values") for col in METRIC_COLUMNS]
+)
+RULES.sort(key=lambda rule: REQUIRED_COLUMNS.index(rule[1]))
+
+
+def _iter_arrow_batches(batches):
+    for batch in batches:
+        yield batch.to_pandas()
+
+
+def iter_chunks(file_path, chunk_rows=CHUNK_ROWS):
+    """Yield a data file as DataFrames of at most ``chunk_rows`` rows."""
+    path = Path(file_path)
+    suffix = path.suffix.lower()
+
+    if path.is_dir():
+        from data_store import open_dataset
+
+        yield from _iter_arrow_batches(open_dataset(path).to_batches(batch_size=chunk_rows))
+    elif suffix in (".xlsx", ".xlsm"):
+        from excel_ingest import cached_sheet, iter_excel
+
+        # Use the ingested Arrow copy while the workbook is unchanged
+        cached = cached_sheet(path, lossless=True)
+        if cached is not None:
+            from data_store import open_ipc
+
+            yield from _iter_arrow_batches(open_ipc(cached).to_batches(max_chunksize=chunk_rows))
+        else:
+            yield from iter_excel(path, chunk_rows)
+    elif suffix == ".xls":
+        # Legacy workbooks cannot be streamed
+        yield pd.read_excel(path)
+    elif suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        yield from _iter_arrow_batches(pq.ParquetFile(path).iter_batches(batch_size=chunk_rows))
+    elif suffix in (".arrow", ".feather", ".ipc"):
+        from data_store import open_ipc
+
+        yield from _iter_arrow_batches(open_ipc(path).to_batches(max_chunksize=chunk_rows))
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_rows)
+
+
+def _violations(series, kind, dates):
+    """Boolean mask of non-missing values that break a rule (vectorized).
+
+    ``dates`` is the chunk's Date column already parsed to datetime64.
+    """
+    present = series.notna()
+    if kind == "text":
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            series = series.astype(series.cat.categories.dtype)
+        if pd.api.types.is_string_dtype(series.dtype) and not pd.api.types.is_object_dtype(series.dtype):
+            return pd.Series(False, index=series.index)
+        if pd.api.types.is_object_dtype(series.dtype):
+            # .str yields NaN for anything that is not a string
+            return present & series.str.len().isna()
+        return present
+    if kind == "date":
+        return present & dates.isna()
+    if pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+        return pd.Series(False, index=series.index)
+    return present & pd.to_numeric(series, errors="coerce").isna()
+
+
+def new_state():
+    """Return an empty, JSON-serializable validation state.
+
+    The state carries the report plus the running unique values and date
+    bounds, so validation can resume later on rows appended to a file.
+    """
+    return {
+        "report": {
+            "rows": 0,
+            "columns": None,
+            "missing_columns": [],
+            "rules": {name: {"violations": 0, "sample_rows": [], "message": message}
+                      for name, _, _, message in RULES},
+            "missing_values": dict.fromkeys(REQUIRED_COLUMNS, 0),
+            "unique": {},
+            "date_range": None,
+            "preview": None,
+            "valid": False,
+            "error": None,
+        },
+        "uniques": {col: [] for col in CATEGORY_COLUMNS},
+        "date_min": None,
+        "date_max": None,
+    }
+
+
+def validate_chunks(chunks, sample_rows=SAMPLE_ROWS, state=None):
+    """Validate a stream of DataFrame chunks and return a report dict.
+
+    The report holds per-rule violation counts with sample offending row
+    indices (0-based data rows), missing values per column, unique counts,
+    the date range and an overall ``valid`` flag. Only running totals are
+    kept between chunks.
+
+    Pass a ``state`` from :func:`new_state` (or from an earlier run) to
+    continue where it stopped; it is updated in place. The chunks of a
+    resumed run are the rows that follow the ones already validated.
+    """
+    if state is None:
+        state = new_state()
+    report = state["report"]
+    if report["missing_columns"]:
+        return report
+
+    uniques = {col: set(values) for col, values in state["uniques"].items()}
+    date_min = pd.Timestamp(state["date_min"]) if state["date_min"] else None
+    date_max = pd.Timestamp(state["date_max"]) if state["date_max"] else None
+    offset = report["rows"]
+
+    for chunk in chunks:
+        if report["columns"] is None:
+            report["columns"] = [str(c) for c in chunk.columns]
+            report["preview"] = chunk.head().to_string(index=False)
+            report["missing_columns"] = [c for c in REQUIRED_COLUMNS if c not in chunk.columns]
+            if report["missing_columns"]:
+                report["rows"] = offset + len(chunk)
+                return report
+
+        # One explicit format, so the verdict does not depend on chunk boundaries
+        dates = parse_dates(chunk[DATE_COLUMN])
+
+        for name, column, kind, _ in RULES:
+            bad = _violations(chunk[column], kind, dates).to_numpy()
+            count = int(bad.sum())
+            if count:
+                rule = report["rules"][name]
+                rule["violations"] += count
+                room = sample_rows - len(rule["sample_rows"])
+                if room > 0:
+                    rule["sample_rows"].extend(int(i) + offset for i in bad.nonzero()[0][:room])
+
+        missing = chunk[REQUIRED_COLUMNS].isna().sum()
+        for column in REQUIRED_COLUMNS:
+            report["missing_values"][column] += int(missing[column])
+
+        for column in CATEGORY_COLUMNS:
+            uniques[column].update(pd.unique(chunk[column].dropna().astype(str)))
+
+        if dates.notna().any():
+            lo, hi = dates.min(), dates.max()
+            date_min = lo if date_min is None else min(date_min, lo)
+            date_max = hi if date_max is None else max(date_max, hi)
+
+        offset += len(chunk)
+
+    report["rows"] = offset
+    state["uniques"] = {column: sorted(values) for column, values in uniques.items()}
+    state["date_min"] = date_min.isoformat() if date_min is not None else None
+    state["date_max"] = date_max.isoformat() if date_max is not None else None
+    if report["columns"] is None:
+        report["error"] = "File contains no data"
+        return report
+
+    report["error"] = None
+    report["unique"] = {column: len(values) for column, values in uniques.items()}
+    if date_min is not None:
+        report["date_range"] = [str(date_min.date()), str(date_max.date())]
+    report["valid"] = not any(rule["violations"] for rule in report["rules"].values())
+    return report
+
+
+def _iter_csv_tail(file_path, start, columns, chunk_rows):
+    """Yield the rows of a CSV file that start at byte offset ``start``."""
+    with open(file_path, "rb") as f:
+        f.seek(start)
+        yield from pd.read_csv(f, header=None, names=columns, chunksize=chunk_rows)
+
+
+def validate_file(file_path, chunk_rows=CHUNK_ROWS, cache=None):
+    """Validate a data file chunk by chunk and return the report dict.
+
+    With a :class:`validation_cache.ValidationCache`, unchanged files are
+    answered from the cache and rows appended to a CSV file are validated
+    on their own and merged into the cached totals. ``report["cache"]``
+    records which path was taken ('hit', 'append' or 'miss').
+    """
+    status = None
     if not Path(file_path).exists():
-        print(f"❌ ERROR: File '{file_path}' not found!")
-        return False
-    
-    try:
-        # Load the Excel file
-        df = pd.read_excel(file_path)
-        print(f"✅ File loaded successfully")
-        print(f"   📊 Shape: {df.shape[0]} rows × {df.shape[1]} columns\n")
-        
-    except Exception as e:
-        print(f"❌ ERROR: Failed to load Excel file: {e}")
-        return False
-    
+        report = validate_chunks([])
+        report["error"] = f"File '{file_path}' not found"
+    else:
+        try:
+            entry = None
+            if cache is not None:
+                status, entry = cache.check(file_path)
+                if status == "append" and entry["state"]["report"]["columns"] is None:
+                    status, entry = "miss", None
+
+            if status == "hit":
+                report = entry["state"]["report"]
+            elif status == "append":
+                state = entry["state"]
+                tail = _iter_csv_tail(file_path, entry["size"], state["report"]["columns"], chunk_rows)
+                report = validate_chunks(tail, state=state)
+                cache.store(file_path, state, previous=entry)
+            else:
+                state = new_state()
+                report = validate_chunks(iter_chunks(file_path, chunk_rows), state=state)
+                if cache is not None:
+                    cache.store(file_path, state)
+        except Exception as e:
+            report = validate_chunks([])
+            report["error"] = f"Failed to load file: {e}"
+    report["file"] = str(file_path)
+    if status is not None:
+        report["cache"] = status
+    return report
+
+
+def print_report(report):
+    """Print a validation report in the dashboard's console style."""
+    if report["error"]:
+        print(f"❌ ERROR: {report['error']}!")
+        return
+
+    print(f"✅ File loaded successfully")
+    print(f"   📊 Shape: {report['rows']} rows × {len(report['columns'])} columns\n")
+
     # Check for required columns
     print("📋 Checking Required Columns:")
     print("-" * 60)
-    all_columns_present = True
-    
     for col in REQUIRED_COLUMNS:
-        if col in df.columns:
-            print(f"✅ {col:20} - Found")
-        else:
+        if col in report["missing_columns"]:
             print(f"❌ {col:20} - MISSING!")
-            all_columns_present = False
-    
-    if not all_columns_present:
+        else:
+            print(f"✅ {col:20} - Found")
+
+    if report["missing_columns"]:
         print(f"\n❌ Missing required columns!")
         print(f"   Required: {', '.join(REQUIRED_COLUMNS)}")
-        print(f"   Found: {', '.join(df.columns.tolist())}")
-        return False
-    
+        print(f"   Found: {', '.join(report['columns'])}")
+        return
+
     print()
-    
+
     # Check data types
     print("🔍 Checking Data Types:")
     print("-" * 60)
-    
-    errors = []
-    
-    # Country - should be string
-    if not all(isinstance(x, str) for x in df['Country'] if pd.notna(x)):
-        errors.append("❌ Country: Must contain only text values")
-    else:
-        print(f"✅ Country:         String")
-    
-    # Date - should be datetime
-    try:
-        pd.to_datetime(df['Date'])
-        print(f"✅ Date:            DateTime (YYYY-MM-DD)")
-    except:
-        errors.append("❌ Date: Must be in YYYY-MM-DD format")
-        print(f"❌ Date:            Invalid format (expected YYYY-MM-DD)")
-    
-    # Brand - should be string
-    if not all(isinstance(x, str) for x in df['Brand'] if pd.notna(x)):
-        errors.append("❌ Brand: Must contain only text values")
-    else:
-        print(f"✅ Brand:           String")
-    
-    # OS - should be string
-    if not all(isinstance(x, str) for x in df['OS'] if pd.notna(x)):
-        errors.append("❌ OS: Must contain only text values")
-    else:
-        print(f"✅ OS:              String")
-    
-    # Market_Share - should be numeric
-    try:
-        pd.to_numeric(df['Market_Share'])
-        print(f"✅ Market_Share:    Numeric (percentage)")
-    except:
-        errors.append("❌ Market_Share: Must contain only numeric values")
-        print(f"❌ Market_Share:    Invalid (must be numeric)")
-    
-    # Users_Millions - should be numeric
-    try:
-        pd.to_numeric(df['Users_Millions'])
-        print(f"✅ Users_Millions:  Numeric")
-    except:
-        errors.append("❌ Users_Millions: Must contain only numeric values")
-        print(f"❌ Users_Millions:  Invalid (must be numeric)")
-    
-    # Usage_Hours - should be numeric
-    try:
-        pd.to_numeric(df['Usage_Hours'])
-        print(f"✅ Usage_Hours:     Numeric")
-    except:
-        errors.append("❌ Usage_Hours: Must contain only numeric values")
-        print(f"❌ Usage_Hours:     Invalid (must be numeric)")
-    
+    for name, rule in report["rules"].items():
+        if rule["violations"]:
+            rows = ", ".join(str(i) for i in rule["sample_rows"])
+            print(f"❌ {name:20} - {rule['violations']} invalid values (e.g. rows {rows})")
+        else:
+            print(f"✅ {name:20} - OK")
+
     print()
-    
+
     # Check for missing values
     print("🔎 Checking for Missing Values:")
     print("-" * 60)
-    
-    missing_data = df.isnull().sum()
-    has_missing = False
-    
-    for col in REQUIRED_COLUMNS:
-        missing_count = missing_data[col]
+    for col, missing_count in report["missing_values"].items():
         if missing_count > 0:
-            print(f"⚠️  {col:20} - {missing_count} missing values ({missing_count/len(df)*100:.1f}%)")
-            has_missing = True
+            print(f"⚠️  {col:20} - {missing_count} missing values ({missing_count/report['rows']*100:.1f}%)")
         else:
             print(f"✅ {col:20} - No missing values")
-    
+
     print()
-    
+
     # Data summary
     print("📊 Data Summary:")
     print("-" * 60)
-    print(f"✅ Unique Countries: {df['Country'].nunique()}")
-    print(f"✅ Unique Brands:    {df['Brand'].nunique()}")
-    print(f"✅ Unique OS:        {df['OS'].nunique()}")
-    print(f"✅ Date Range:       {df['Date'].min()} to {df['Date'].max()}")
-    print(f"✅ Records:          {len(df)}")
-    
+    print(f"✅ Unique Countries: {report['unique'].get('Country', 0)}")
+    print(f"✅ Unique Brands:    {report['unique'].get('Brand', 0)}")
+    print(f"✅ Unique OS:        {report['unique'].get('OS', 0)}")
+    if report["date_range"]:
+        print(f"✅ Date Range:       {report['date_range'][0]} to {report['date_range'][1]}")
+    print(f"✅ Records:          {report['rows']}")
+
     # Sample data
     print()
     print("📋 Sample Data (First 5 Rows):")
     print("-" * 60)
-    print(df.head().to_string(index=False))
-    
+    print(report["preview"])
+
     print()
-    
+
+
+def validate_excel_file(file_path, chunk_rows=CHUNK_ROWS, cache=None):
+    """Validate a data file's structure and data types, printing a report.
+
+    Despite the name, any supported format is accepted. Returns True if the
+    file is valid.
+    """
+
+    print(f"\n{'='*60}")
+    print(f"📋 Validating Data File: {file_path}")
+    print(f"{'='*60}\n")
+
+    report = validate_file(file_path, chunk_rows, cache)
+    if report.get("cache") == "hit":
+        print("♻️  File unchanged since last validation - using cached result\n")
+    elif report.get("cache") == "append":
+        print("♻️  Only rows appended since last validation were checked\n")
+    print_report(report)
+
     # Final validation result
-    if errors:
+    if not report["valid"]:
         print(f"{'='*60}")
         print("❌ VALIDATION FAILED")
         print(f"{'='*60}")
-        for error in errors:
-            print(error)
+        for name, rule in report["rules"].items():
+            if rule["violations"]:
+                print(f"❌ {name.split(':')[0]}: {rule['message']} ({rule['violations']} rows)")
         return False
     else:
         print(f"{'='*60}")
@@ -159,32 +360,137 @@ def validate_excel_file(file_path):
         print(f"Run: streamlit run mobile_analytics.py")
         return True
 
+def _is_dataset_dir(path):
+    return any(Path(path).glob('Country=*'))
+
+
+def expand_paths(patterns):
+    """Expand files, directories and glob patterns into a list of data sources.
+
+    Partitioned datasets (directories with Country=... partitions) count as
+    a single source; other directories contribute their data files.
+    """
+    paths = []
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern, recursive=True))
+        else:
+            matches = [pattern]
+        for match in matches:
+            path = Path(match)
+            if path.is_dir() and not _is_dataset_dir(path):
+                paths.extend(sorted(str(p) for p in path.iterdir()
+                                    if p.is_file() and p.suffix.lower() in DATA_SUFFIXES))
+            else:
+                paths.append(str(path))
+    return list(dict.fromkeys(paths))
+
+
+def summarize_report(report):
+    """Reduce a report to a JSON-serializable per-file summary."""
+    return {
+        "file": report["file"],
+        "valid": report["valid"],
+        "error": report["error"],
+        "rows": report["rows"],
+        "missing_columns": report["missing_columns"],
+        "violations": {
+            name: {"count": rule["violations"], "sample_rows": rule["sample_rows"]}
+            for name, rule in report["rules"].items()
+            if rule["violations"]
+        },
+        "missing_values": report["missing_values"],
+        "date_range": report["date_range"],
+        "unique": report["unique"],
+        "cache": report.get("cache"),
+    }
+
+
+def _validate_summary(file_path, chunk_rows=CHUNK_ROWS, cache=None):
+    """Process pool task: validate one file and return its summary."""
+    return summarize_report(validate_file(file_path, chunk_rows, cache))
+
+
+def validate_files(paths, workers=None, chunk_rows=CHUNK_ROWS, cache=None):
+    """Validate many files concurrently, yielding summaries in input order."""
+    workers = min(workers or os.cpu_count() or 1, max(len(paths), 1))
+    if workers == 1:
+        for path in paths:
+            yield _validate_summary(path, chunk_rows, cache)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(_validate_summary, paths, [chunk_rows] * len(paths), [cache] * len(paths))
+
+
 def main():
     """Main function"""
-    
-    if len(sys.argv) < 2:
+
+    parser = argparse.ArgumentParser(description="Validate data files for the Mobile Analytics Dashboard.")
+    parser.add_argument('paths', nargs='*', help="Files, directories or glob patterns to validate")
+    parser.add_argument('--format', choices=['text', 'json', 'ndjson'],
+                        help="Output format (default: text for one file, ndjson for several)")
+    parser.add_argument('--workers', type=int, help="Worker processes for batch mode (default: CPU count)")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help="Rows read per chunk")
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help="Where validation results are cached")
+    parser.add_argument('--no-cache', action='store_true', help="Re-validate every file from scratch")
+    parser.add_argument('--verify-hash', action='store_true',
+                        help="Re-hash cached files instead of trusting size and modification time")
+    args = parser.parse_args()
+    cache = None if args.no_cache else ValidationCache(args.cache_dir, verify_hash=args.verify_hash)
+
+    if not args.paths:
         # No file specified, try common names
         possible_files = ['sample_mobile_data.xlsx', 'mobile_data.xlsx', 'data.xlsx']
         file_to_check = None
-        
+
         for file_name in possible_files:
             if Path(file_name).exists():
                 file_to_check = file_name
                 break
-        
+
         if not file_to_check:
-            print("\n📝 Usage: python validate_data.py <excel_file>")
+            print("\n📝 Usage: python validate_data.py <data_file> [more files, directories or globs]")
             print("\nExample: python validate_data.py sample_mobile_data.xlsx")
+            print("\nSupported formats: .xlsx, .csv, .parquet, .arrow and dataset directories")
             print("\nOr place your file in the same directory with one of these names:")
             print(f"   - sample_mobile_data.xlsx")
             print(f"   - mobile_data.xlsx")
             print(f"   - data.xlsx")
             sys.exit(1)
+        paths = [file_to_check]
     else:
-        file_to_check = sys.argv[1]
-    
-    success = validate_excel_file(file_to_check)
-    sys.exit(0 if success else 1)
+        paths = expand_paths(args.paths)
+
+    batch = len(paths) != 1 or any(
+        glob.has_magic(p) or (Path(p).is_dir() and not _is_dataset_dir(p)) for p in args.paths
+    )
+    output_format = args.format or ('ndjson' if batch else 'text')
+
+    if output_format == 'text' and not batch:
+        success = validate_excel_file(paths[0], args.chunk_rows, cache)
+        sys.exit(0 if success else 1)
+
+    if not paths:
+        print("❌ ERROR: No data files found!", file=sys.stderr)
+        sys.exit(1)
+
+    summaries = []
+    failed = 0
+    for summary in validate_files(paths, args.workers, args.chunk_rows, cache):
+        failed += not summary["valid"]
+        if output_format == 'ndjson':
+            print(json.dumps(summary), flush=True)
+        elif output_format == 'json':
+            summaries.append(summary)
+        else:
+            status = "✅" if summary["valid"] else "❌"
+            problem = summary["error"] or ", ".join(summary["violations"]) or ", ".join(summary["missing_columns"])
+            print(f"{status} {summary['file']} - {summary['rows']} rows" + (f" - {problem}" if problem else ""))
+
+    if output_format == 'json':
+        print(json.dumps(summaries, indent=2))
+    print(f"{len(paths) - failed}/{len(paths)} files valid", file=sys.stderr)
+    sys.exit(1 if failed else 0)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+"""
+Validation Cache
+
+Remembers the result of validating each data file so that unchanged files
+are skipped and append-only files only have their new tail validated.
+
+An entry is keyed by the file's absolute path and stores its size, mtime,
+SHA-256 digests of fixed-size blocks and the validator's resumable state.
+By default a file with the same size and mtime is trusted as unchanged and
+only the block containing the previous end of file is re-hashed before an
+append is accepted. A file of the same size with a new mtime may have been
+edited anywhere, so all of its blocks are re-hashed; with ``verify_hash``
+every previously validated block is always re-hashed.
+"""
+
+CACHE_DIR = '.validation_cache'
+BLOCK_BYTES = 16 * 2**20
+CACHE_VERSION = 1
+
+# Formats whose appended bytes can be validated on their own
+APPENDABLE_SUFFIXES = ('.csv',)
+
+
+def block_digests(path, start_block=0, stop=None, block_bytes=BLOCK_BYTES):
+    """SHA-256 hex digests of consecutive blocks of a file.
+
+    Hashes from block ``start_block`` up to byte ``stop`` (default: end of
+    file); the last block may be partial.
+    """
+    digests = []
+    with open(path, 'rb') as f:
+        f.seek(start_block * block_bytes)
+        position = start_block * block_bytes
+        while stop is None or position < stop:
+            size = block_bytes if stop is None else min(block_bytes, stop - position)
+            data = f.read(size)
+            if not data:
+                break
+            digests.append(hashlib.sha256(data).hexdigest())
+            position += len(data)
+    return digests
+
+
+class ValidationCache:
+    """On-disk cache of validation state, one JSON file per data file.
+
+    Args:
+        cache_dir: Directory holding the cache entries.
+        verify_hash: Re-hash all previously validated content instead of
+            trusting size and mtime.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, verify_hash=False, block_bytes=BLOCK_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.verify_hash = verify_hash
+        self.block_bytes = block_bytes
+
+    def _entry_path(self, path):
+        key = hashlib.sha1(str(Path(path).resolve()).encode()).hexdigest()
+        return self.cache_dir / f'{key}.json'
+
+    def load(self, path):
+        """Return the cache entry for a file, or None."""
+        try:
+            entry = json.loads(self._entry_path(path).read_text())
+        except (OSError, ValueError):
+            return None
+        if entry.get('version') != CACHE_VERSION or entry.get('block_bytes') != self.block_bytes:
+            return None
+        return entry
+
+    def check(self, path):
+        """Classify a file against its cache entry.
+
+        Returns ``(status, entry)`` where status is 'hit' (unchanged),
+        'append' (previous content intact, new bytes at the end) or 'miss'.
+        """
+        entry = self.load(path)
+        if entry is None or Path(path).is_dir():
+            return 'miss', None
+
+        stat = os.stat(path)
+        old_size = entry['size']
+        if stat.st_size == old_size and stat.st_mtime_ns == entry['mtime_ns'] and not self.verify_hash:
+            return 'hit', entry
+        if stat.st_size < old_size or not entry['digests']:
+            return 'miss', None
+
+        # Re-hash the previously validated content, or just its last block for
+        # an append; a same-size rewrite can change any block
+        last_block = len(entry['digests']) - 1
+        first_block = 0 if self.verify_hash or stat.st_size == old_size else last_block
+        current = block_digests(path, first_block, old_size, self.block_bytes)
+        if current != entry['digests'][first_block:]:
+            return 'miss', None
+
+        if stat.st_size == old_size:
+            return 'hit', entry
+        if entry['appendable']:
+            return 'append', entry
+        return 'miss', None
+
+    def store(self, path, state, previous=None):
+        """Save a file's validation state.
+
+        When ``previous`` is the entry an append was validated against, only
+        blocks from its last (possibly partial) block onward are re-hashed.
+        """
+        path = Path(path)
+        if path.is_dir():
+            return
+        stat = os.stat(path)
+        if previous is not None and previous['digests']:
+            keep = len(previous['digests']) - 1
+            digests = previous['digests'][:keep] + block_digests(path, keep, stat.st_size, self.block_bytes)
+        else:
+            digests = block_digests(path, 0, stat.st_size, self.block_bytes)
+
+        appendable = False
+        if path.suffix.lower() in APPENDABLE_SUFFIXES and stat.st_size:
+            with open(path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                appendable = f.read(1) == b'\n'
+
+        entry = {
+            'version': CACHE_VERSION,
+            'path': str(path.resolve()),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'block_bytes': self.block_bytes,
+            'digests': digests,
+            'appendable': appendable,
+            'state': state,
+        }
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        target = self._entry_path(path)
+        temporary = target.with_suffix(f'.{os.getpid()}.tmp')
+        temporary.write_text(json.dumps(entry))
+        os.replace(temporary, target)